@@ -1,7 +1,7 @@
 import sys
 from io import TextIOWrapper
 import numpy as np
-from scipy import optimize
+from scipy import optimize, stats
 import inspect
 
 
@@ -22,8 +22,23 @@ def power(x):
     return power_string
 
 
-def chi_squared(f, xs, ys, errors):
-    return sum([((y - f(x)) / error)**2 for x, y, error in zip(xs, ys, errors)])
+def chi_squared(f, xs, ys, errors, n_params=None):
+    """Returns the χ² of model `f' on the data. `f' is called once on the whole xs array,
+    or per point if it does not support arrays.
+    If the number of fitted parameters `n_params' is given, returns (χ², reduced χ², degrees of freedom, p-value).
+    """
+    xs, ys, errors = np.asarray(xs), np.asarray(ys, dtype=float), np.asarray(errors, dtype=float)
+    try:
+        model = np.asarray(f(xs), dtype=float)
+        if model.shape not in (ys.shape, ()):
+            raise ValueError("f does not work on arrays")
+    except (TypeError, ValueError):
+        model = np.fromiter((f(x) for x in xs), dtype=float, count=len(xs))
+    chi2 = float(np.sum(((ys - model) / errors)**2))
+    if n_params is None:
+        return chi2
+    dof = len(ys) - n_params
+    return chi2, chi2 / dof, dof, float(stats.chi2.sf(chi2, dof))
 
 
 class ParamDict(dict):
@@ -108,13 +123,13 @@ class floatE:
             return floatE(self.val - a, self.error)
 
     def __rsub__(self, a):
-        return floatE(self.val - a, self.error)
+        return floatE(a - self.val, self.error)
 
     def __mul__(self, a):
         try:
             return floatE(self.val * a.val, np.sqrt((self.val * a.error)**2 + (a.val * self.error)**2))
         except AttributeError:
-            return floatE(self.val * a, self.error * a)
+            return floatE(self.val * a, self.error * abs(a))
 
     def __rmul__(self, a):
         return floatE(self.val * a, self.error * abs(a))
@@ -123,10 +138,10 @@ class floatE:
         try:
             return floatE(self.val / a.val, np.sqrt((self.error / a.val)**2 + (self.val * a.error / a.val**2)**2))
         except AttributeError:
-            return floatE(self.val / a, self.error / a)
+            return floatE(self.val / a, self.error / abs(a))
 
     def __rtruediv__(self, a):
-        return floatE(a / self.val, a * self.error / self.val**2)
+        return floatE(a / self.val, abs(a * self.error / self.val**2))
 
     def __pow__(self, a):
         try:
@@ -134,7 +149,7 @@ class floatE:
                             2 + (np.log(self.val) * self.val**a.val * a.error) ** 2)
             return floatE(self.val**a.val, error)
         except AttributeError:  # `a` is a regular float
-            return floatE(self.val**a, a * self.val * (a - 1) * self.error)
+            return floatE(self.val**a, abs(a * self.val**(a - 1) * self.error))
 
     def __rpow__(self, a):  # a^self
         return floatE(a ** self.val, abs(np.log(a) * a**self.val * self.error))
@@ -1,16 +1,56 @@
 """
-Contains the ArduinoVISADevice class.
+Contains the ArduinoVISADevice class, and a registry of open devices.
+The pyvisa ResourceManager is shared by the whole process, and the list of resources is cached.
 Usage:
-    devicedevice = ArduinoVISADevice(port=None)
+    device = get_device(port=None)
     device.set_output_value(channel=0, value=512)
     volt_ch0 = device.get_output_voltage(channel=0)
 """
 
+import atexit
+import threading
+import time
+from collections import deque
+
+import numpy as np
 import pyvisa
 
 
+RESOURCES_TTL = 10  # s, how long list_resources() returns the cached list
+# Commands sent ahead in pipeline(). The serial input buffer of an Arduino is only 64 bytes.
+PIPELINE_DEPTH = 3
+BLOCK_SAMPLE_BYTES = 6  # Bytes per value in the answer to the block command, `1.23,' and a margin
+BLOCK_MAX_FAILURES = 3  # Block commands without an answer, before falling back for good
+
+_rm = None
+_rm_lock = threading.Lock()
+_resources = None  # (time of listing, resources)
+_resources_lock = threading.Lock()
+
+
+def resource_manager():
+    """Returns the pyvisa ResourceManager of the process, created at the first call."""
+    global _rm
+    with _rm_lock:
+        if _rm is None:
+            _rm = pyvisa.ResourceManager("@py")
+        return _rm
+
+
+def list_resources(ttl=RESOURCES_TTL, refresh=False):
+    """Returns the available resources. Listing them is slow, so the list is cached for `ttl' seconds.
+    With `refresh', the resources are always listed again.
+    """
+    global _resources
+    with _resources_lock:
+        if refresh or _resources is None or time.monotonic() - _resources[0] > ttl:
+            _resources = (time.monotonic(), tuple(resource_manager().list_resources()))
+        return _resources[1]
+
+
 class ArduinoVISADevice:
     """A wrapper class to give commands to an Arduino using the VISA interface. Uses pyvisa.
+        Opening a connection resets the Arduino, use get_device() to reuse an open connection.
         Usage:
             devicedevice = ArduinoVISADevice(port=None)
             device.set_output_value(channel=0, value=512)
@@ -19,46 +59,185 @@ class ArduinoVISADevice:
 
     def __init__(self, port=None):
         """Instantiates a connection between the instance and the arduino."""
-        self.rm = pyvisa.ResourceManager("@py")
+        self.rm = resource_manager()
         if not port:
-            port = self.rm.list_resources()[-1]
-            # print(self.rm.list_resources())
+            port = list_resources()[-1]
+        self.port = port
+        # Queries from different threads should not interleave on the serial line
+        self.lock = threading.RLock()
+        # Whether the firmware knows the block command, see measure_input_voltage_block()
+        self.supports_block = True
+        self.block_failures = 0
+        self.open()
+
+    def open(self):
+        """(Re)opens the connection to the device on `self.port'."""
         self.device = self.rm.open_resource(
-            port, read_termination="\r\n", write_termination="\n", timeout=100)
+            self.port, read_termination="\r\n", write_termination="\n", timeout=100)
+
+    def close(self):
+        """Closes the connection, errors of an already broken connection are ignored."""
+        try:
+            self.device.close()
+        except (pyvisa.errors.Error, OSError):
+            pass
+
+    def is_alive(self):
+        """Whether the device still answers to `*IDN?'."""
+        try:
+            return bool(self.get_hardware_info())
+        except (pyvisa.errors.Error, OSError):
+            return False
 
     def query(self, query):
         """Can directly any command, should this be neccesary."""
-        return self.device.query(query)
+        with self.lock:
+            return self.device.query(query)
+
+    def pipeline(self, commands, depth=PIPELINE_DEPTH, timeout=None):
+        """Yields the responses to `commands' in order, sending up to `depth' commands before
+        reading the response to the first, so the round-trips overlap.
+        Every command gets `timeout' ms (the device timeout by default) for its response, counted
+        from when it was sent or the previous response arrived, whichever is later. Raises a
+        TimeoutError naming the command if it is exceeded.
+        """
+        commands = iter(commands)
+        in_flight = deque()  # (command, time sent)
+        with self.lock:
+            device_timeout = self.device.timeout
+            budget = (device_timeout if timeout is None else timeout) / 1000
+            last_response = time.monotonic()
+            try:
+                while True:
+                    while len(in_flight) < depth:
+                        command = next(commands, None)
+                        if command is None:
+                            break
+                        self.device.write(command)
+                        in_flight.append((command, time.monotonic()))
+                    if not in_flight:
+                        return
+                    command, sent = in_flight.popleft()
+                    deadline = max(sent, last_response) + budget
+                    self.device.timeout = max(1, 1000 * (deadline - time.monotonic()))
+                    try:
+                        response = self.device.read()
+                    except pyvisa.errors.VisaIOError as error:
+                        raise TimeoutError(f"No response to '{command}' within {1000 * budget:.0f} ms!") from error
+                    last_response = time.monotonic()
+                    yield response
+            finally:
+                # Responses to commands that are still in flight would end up in the next query
+                self.device.timeout = device_timeout
+                for _ in in_flight:
+                    try:
+                        self.device.read()
+                    except pyvisa.errors.VisaIOError:
+                        break
 
     def get_hardware_info(self):
         """Returns the hardware info of the device."""
-        return self.device.query("*IDN?")
+        return self.query("*IDN?")
 
     def set_output_value(self, channel=0, value=600):
         """Sets the output value (Between 0 and 1023) of channel to value."""
-        return self.device.query(f"OUT:CH{channel} {value}")
+        return self.query(f"OUT:CH{channel} {value}")
 
     def set_output_voltage(self, channel=0, voltage=2.0):
         """Sets the output voltage (Between 0 and 3.3V) of channel to value."""
-        return self.device.query(f"OUT:CH{channel}:VOLT {voltage}")
+        return self.query(f"OUT:CH{channel}:VOLT {voltage}")
 
     def get_output_value(self, channel=0):
         """Returns the ouput value (Between 0 and 1023) of the channel specified."""
-        return int(self.device.query(f"OUT:CH{channel}?"))
+        return int(self.query(f"OUT:CH{channel}?"))
 
     def get_output_voltage(self, channel=0):
         """Returns the output voltage (Between 0 and 3.3 V) of the channel specified."""
-        return float(self.device.query(f"OUT:CH{channel}:VOLT?"))
+        return float(self.query(f"OUT:CH{channel}:VOLT?"))
 
     def measure_input_value(self, channel=0):
         """Returns the measured value (Between 0 and 1023) of the channel specified."""
-        return int(self.device.query(f"MEAS:CH{channel}?"))
+        return int(self.query(f"MEAS:CH{channel}?"))
 
     def measure_input_voltage(self, channel=1):
         """Returns the measured voltage (Between 0 and 3.3 V) of the channel specified."""
-        return float(self.device.query(f"MEAS:CH{channel}:VOLT?"))
+        return float(self.query(f"MEAS:CH{channel}:VOLT?"))
+
+    def measure_input_voltage_block(self, channel=1, n=1):
+        """Returns `n' measured voltages (Between 0 and 3.3 V) of the channel specified, as a numpy array.
+        Uses a single `MEAS:CH<channel>:VOLT:BLOCK? <n>' command, answered by one line of comma
+        separated voltages. Falls back to `n' separate measurements if there is no valid answer. The
+        block command is no longer used once the firmware answered it wrongly (it does not know it),
+        or after BLOCK_MAX_FAILURES times in a row without an answer.
+        """
+        if self.supports_block:
+            answer = None
+            with self.lock:
+                timeout = self.device.timeout
+                # Allow for sending the answer, 10 bits per byte on the serial line
+                baud_rate = getattr(self.device, "baud_rate", 9600)
+                self.device.timeout = timeout + 1000 * 10 * BLOCK_SAMPLE_BYTES * n / baud_rate
+                try:
+                    answer = self.device.query(f"MEAS:CH{channel}:VOLT:BLOCK? {n}")
+                except (pyvisa.errors.Error, OSError):
+                    # A late answer would end up in the next query
+                    try:
+                        self.device.clear()
+                    except (pyvisa.errors.Error, OSError):
+                        pass
+                finally:
+                    self.device.timeout = timeout
+            if answer is None:
+                self.block_failures += 1
+                self.supports_block = self.block_failures < BLOCK_MAX_FAILURES
+            else:
+                try:
+                    voltages = np.array(answer.split(','), dtype=float)
+                except ValueError:
+                    voltages = None
+                if voltages is not None and len(voltages) == n:
+                    self.block_failures = 0
+                    return voltages
+                self.supports_block = False
+        return np.array([self.measure_input_voltage(channel) for _ in range(n)])
 
     @classmethod
-    def get_resources(cls):
-        cls.rm = pyvisa.ResourceManager("@py")
-        return cls.rm.list_resources() 
\ No newline at end of file
+    def get_resources(cls, refresh=False):
+        """Returns the available resources, see list_resources()."""
+        return list_resources(refresh=refresh)
+
+
+# The open devices, by port. Shared by the whole process, see get_device().
+_devices = {}
+_devices_lock = threading.Lock()
+
+
+def get_device(port=None):
+    """Returns the open ArduinoVISADevice on `port' (the last resource if None), opening it only if
+    there is none yet. The device is checked with `*IDN?' first, and reconnected if it does not answer.
+    """
+    with _devices_lock:
+        if not port:
+            port = list_resources()[-1]
+        device = _devices.get(port)
+        if device is None:
+            device = _devices[port] = ArduinoVISADevice(port)
+        elif not device.is_alive():
+            device.close()
+            try:
+                device.open()
+            except (pyvisa.errors.Error, OSError):
+                del _devices[port]
+                raise
+        return device
+
+
+def close_all():
+    """Closes all devices opened by get_device(), called at exit."""
+    with _devices_lock:
+        for device in _devices.values():
+            device.close()
+        _devices.clear()
+
+
+atexit.register(close_all)
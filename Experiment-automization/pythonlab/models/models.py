@@ -1,19 +1,29 @@
 """Contains function evoked by pythonlab.views, computes results by evoking pythonlab.controllers."""
 
-from pythonlab.controllers.arduino_device import ArduinoVISADevice
+from pythonlab.controllers.arduino_device import ArduinoVISADevice, get_device
 import numpy as np
 import time
 import random
+from collections import deque
+from itertools import chain, repeat
 
 # Note: The use of classes here is redundant in my opinion, as all the methods defined here need to function independently anyway. It is for this reason that all we only have classmethods here.
 
+SETTLE_TOLERANCE = 0.0033  # V, the resolution of the arduino
+SETTLE_READINGS = 3  # The number of consecutive readings that should agree
+MAX_DWELL = 0.1  # s, the fixed waiting time that adaptive settling replaces
+
 
 class DiodeExperiment:
+    # (voltage, settle time, settled) of every point of the last adaptive sweep, see settling_statistics()
+    settle_log = []
+
     @classmethod
-    def get_resources(cls, search):
-        """Yields all the resources the ArduinoVISADevice() can find, filtered by the search query. Returns all the resources if search is None."""
+    def get_resources(cls, search, refresh=False):
+        """Yields all the resources the ArduinoVISADevice() can find, filtered by the search query. Returns all the resources if search is None.
+        The resources are cached for a few seconds, unless `refresh'."""
         # Get resources
-        resources = ArduinoVISADevice.get_resources()
+        resources = ArduinoVISADevice.get_resources(refresh=refresh)
         for resource in resources:
             if search in resource:
                 # A generator symplifies the code in pythonlab.views
@@ -24,7 +34,7 @@ class DiodeExperiment:
         """Returns the device information of device on `port'."""
         # Exception handling if no connection can be made to the device.
         try:
-            device = ArduinoVISADevice(port)
+            device = get_device(port)
             return device.get_hardware_info()
         except:
             return
@@ -32,12 +42,10 @@ class DiodeExperiment:
     @classmethod
     def get_current(cls, input_voltage, n, **kwargs):
         """Returns the measured current through the diode, with specified `input_voltage' applied. The current is measured `n' times."""
-        device = ArduinoVISADevice(**kwargs)
-        voltages = []
-        for _ in range(n):
-            # The pythonlab.controllers does all the real work here, really.
-            device.set_output_voltage(voltage=input_voltage)
-            voltages.append(device.measure_input_voltage(channel=2))
+        device = get_device(**kwargs)
+        device.set_output_voltage(voltage=input_voltage)
+        # The pythonlab.controllers does all the real work here, really. All n measurements in one command.
+        voltages = device.measure_input_voltage_block(channel=2, n=n)
 
         device.set_output_voltage(voltage=0)
         v_mean = np.mean(voltages)
@@ -51,12 +59,56 @@ class DiodeExperiment:
         return v_mean / 220, v_std / 220
 
     @classmethod
-    def get_voltages(cls, v_min, v_max, n, **kwargs):
-        """Measures the voltage across the resistor when the input voltages is varied between `v_min' and `v_max', measurese at `n' different input voltages."""
-        device = ArduinoVISADevice(**kwargs)
-        for voltage in np.linspace(v_min, v_max, num=n):
-            device.set_output_voltage(voltage=voltage)
-            time.sleep(0.1)
-            # Once again, a generator symplifies the code in pythonlab.views
-            yield device.measure_input_voltage(channel=2)
+    def settle(cls, device, voltage, tolerance=SETTLE_TOLERANCE, max_dwell=MAX_DWELL):
+        """Sets the output to `voltage' and samples channel 2 as fast as possible, until the last SETTLE_READINGS
+        readings agree within `tolerance' V, or `max_dwell' seconds have passed. Returns (last reading, settle time, settled)."""
+        start = time.monotonic()
+        readings = deque(maxlen=SETTLE_READINGS)
+        responses = device.pipeline(chain([f"OUT:CH0:VOLT {voltage}"], repeat("MEAS:CH2:VOLT?")))
+        try:
+            next(responses)  # The response to the set command
+            for response in responses:
+                readings.append(float(response))
+                elapsed = time.monotonic() - start
+                settled = len(readings) == readings.maxlen and max(readings) - min(readings) <= tolerance
+                if settled or elapsed >= max_dwell:
+                    return readings[-1], elapsed, settled
+        finally:
+            responses.close()
+
+    @classmethod
+    def settling_statistics(cls):
+        """Returns statistics of the settle times (s) of the last adaptive sweep, as a dict."""
+        if not cls.settle_log:
+            return {}
+        times = np.array([settle_time for _, settle_time, _ in cls.settle_log])
+        return {"points": len(times), "mean": times.mean(), "median": np.median(times), "max": times.max(),
+                "total": times.sum(), "unsettled": sum(not settled for _, _, settled in cls.settle_log)}
+
+    @classmethod
+    def get_voltages(cls, v_min, v_max, n, settle=None, tolerance=SETTLE_TOLERANCE, max_dwell=MAX_DWELL, **kwargs):
+        """Measures the voltage across the resistor when the input voltages is varied between `v_min' and `v_max', measurese at `n' different input voltages.
+        By default, every point waits until the circuit has settled (see settle()), the settle times are kept in `settle_log'.
+        Otherwise, waits a fixed `settle' seconds after setting each voltage. With settle=0, the commands are pipelined (see ArduinoVISADevice.pipeline())."""
+        device = get_device(**kwargs)
+        voltages = np.linspace(v_min, v_max, num=n)
+        if settle is None:
+            cls.settle_log = []
+            for voltage in voltages:
+                reading, settle_time, settled = cls.settle(device, voltage, tolerance, max_dwell)
+                cls.settle_log.append((voltage, settle_time, settled))
+                yield reading
+        elif settle:
+            for voltage in voltages:
+                device.set_output_voltage(voltage=voltage)
+                time.sleep(settle)
+                # Once again, a generator symplifies the code in pythonlab.views
+                yield device.measure_input_voltage(channel=2)
+        else:
+            commands = (command for voltage in voltages
+                        for command in (f"OUT:CH0:VOLT {voltage}", "MEAS:CH2:VOLT?"))
+            responses = device.pipeline(commands)
+            # The responses alternate between the set command and the measurement
+            for _, measurement in zip(responses, responses):
+                yield float(measurement)
         device.set_output_voltage(voltage=0)
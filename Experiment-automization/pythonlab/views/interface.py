@@ -38,8 +38,10 @@ class UserInterface(QtWidgets.QMainWindow):
         uic.loadUi(pkg_resources.resource_stream(
             "pythonlab.views", "currentplotter.ui"), self)
 
-        # Resources, following line takes long time:
-        self.resource_select.addItems(DE.get_resources(''))
+        # Resources, listing takes a long time, so it is done in a ResourceThread.
+        # The refresh button lists them again, instead of using the cached list.
+        self.refresh_button.clicked.connect(lambda: self.load_resources(refresh=True))
+        self.load_resources()
         # Some alternative hardcoding for testing purposes may be desirable:
         # resources = ['ASRLCOM3::INSTR', 'ASRLCOM4::INSTR', 'ASRLCOM5::INSTR']
         # self.resource_select.addItems(resources)
@@ -77,6 +79,24 @@ class UserInterface(QtWidgets.QMainWindow):
         self.browsebutton.clicked.connect(self.file_select)
         self.savebutton.clicked.connect(self.save_data)
 
+    def load_resources(self, refresh=False):
+        """Lists the resources in a ResourceThread, shows them in resource_select once found."""
+        self.refresh_button.setEnabled(False)
+        self.resource_thread = ResourceThread(refresh=refresh)
+        self.resource_thread.resources_signal.connect(self.show_resources)
+        self.resource_thread.start()
+        logging.debug(f"Listing resources, refresh={refresh}.")
+
+    def show_resources(self, resources):
+        """Shows `resources' in resource_select, keeps the current selection if it is still there."""
+        current = self.resource_select.currentText()
+        self.resource_select.clear()
+        self.resource_select.addItems(resources)
+        if current in resources:
+            self.resource_select.setCurrentText(current)
+        self.refresh_button.setEnabled(True)
+        logging.info(f"Found resources {resources}.")
+
     def set_device(self):
         """Sets default resource (port), displays it"""
         self.resource = self.resource_select.currentText()
@@ -200,6 +220,26 @@ class UserInterface(QtWidgets.QMainWindow):
         self.ys = ys
 
 
+class ResourceThread(QtCore.QThread):
+    resources_signal = QtCore.pyqtSignal(list)
+
+    def __init__(self, refresh=False):
+        QtCore.QThread.__init__(self)
+        self.refresh = refresh
+
+    def __del__(self):
+        self.wait()
+
+    def run(self):
+        # Always emits, the refresh button is enabled again when the resources are shown
+        try:
+            resources = list(DE.get_resources('', refresh=self.refresh))
+        except Exception as error:  # No VISA backend, or a pyvisa error while listing
+            logging.error(f"Cannot list the resources: {error!r}")
+            resources = []
+        self.resources_signal.emit(resources)
+
+
 class DataCollectionThread(QtCore.QThread):
     ys_signal = QtCore.pyqtSignal(list, list)
 
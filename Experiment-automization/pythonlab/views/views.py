@@ -3,6 +3,7 @@
 
 import click
 from pythonlab.models.models import *
+from pythonlab.models.models import SETTLE_TOLERANCE, MAX_DWELL
 from pythonlab.views.helpers import formatter
 
 
@@ -59,12 +60,21 @@ def measure(voltage, count):
 @click.option('-vmi', type=float, default=0, help='The lowerbound of the voltage scanning range.') 
 @click.option('-vma', type=float, default=3, help='The upperbound of the voltage scanning range.')
 @click.option('-n', default=15, type=int, help='The amount of voltages in scanning range.')
+@click.option('-s', '--settle', default=None, type=float, help='A fixed waiting time after setting a voltage (s), 0 to pipeline the commands. Waits until the voltage has settled if left blank.')
+@click.option('--tolerance', default=SETTLE_TOLERANCE, type=float, help='The voltage (V) within which consecutive readings should agree to be settled.')
+@click.option('--max-dwell', default=MAX_DWELL, type=float, help='The maximum settling time (s) per point.')
 @click.argument('out', type=click.File('w'), default='-', required=False)
-def scan(vmi, vma, n, out):
+def scan(vmi, vma, n, settle, tolerance, max_dwell, out):
     """Measures voltage across diode after applying a range of voltages.
     This range consists of [n] (default 15) points between [vmi] and [vmax].
     The resulting voltages can be shown to the console if [OUT] is left blank,
     or can be written to a file, specified with [OUT].
+    The settling statistics are shown on stderr.
     """
-    for i, voltage in enumerate(DiodeExperiment.get_voltages(vmi, vma, n)):
-        click.echo(f"{i},{voltage}", file=out)
\ No newline at end of file
+    voltages = DiodeExperiment.get_voltages(vmi, vma, n, settle=settle, tolerance=tolerance, max_dwell=max_dwell)
+    for i, voltage in enumerate(voltages):
+        click.echo(f"{i},{voltage}", file=out)
+    stats = DiodeExperiment.settling_statistics()
+    if settle is None and stats:  # No statistics for an empty sweep
+        click.echo(f"Settled {stats['points'] - stats['unsettled']} of {stats['points']} points, settle time "
+                   f"mean {1000 * stats['mean']:.1f} ms, max {1000 * stats['max']:.1f} ms, total {stats['total']:.2f} s.", err=True)
\ No newline at end of file
@@ -4,19 +4,14 @@ import pandas as pd
 from matplotlib import pyplot as plt
 from scipy import optimize, integrate, stats
 
-from uncertainties import ufloat, unumpy, ufloat_fromstr
-
 
 df = pd.read_csv('data.csv')
 print(df)
 
 # First, let us convert the masses to N_particles
 molar_mass = 138.205
-carbonate_mass = unumpy.uarray(
-    df['carbonate_mass'].to_numpy(), [0.004] * 7)[1:]
-
-for x in carbonate_mass:
-    x.tag = "mass"
+carbonate_mass = floatEC(
+    df['carbonate_mass'].to_numpy(), 0.004, tag="mass")[1:]
 
 moles = carbonate_mass / molar_mass
 
@@ -24,7 +19,7 @@ moles = carbonate_mass / molar_mass
 moles_K = moles * 2
 
 # Natural abunance of K is 1.17(1)×10−4
-K_active_fraction = ufloat(1.17e-4, 1e-6, tag="f_active")
+K_active_fraction = floatEC(1.17e-4, 1e-6, tag="f_active")
 moles_K_active = moles_K * K_active_fraction
 
 # From moles to N particles.
@@ -35,28 +30,28 @@ print(f"{N_K_active = }")
 # The geometric efficiency
 # Note: The geomteric efficiency is dependant on the location of the decaying particle.
 # This is why we integrate dx and use the mean value.
+# e_geo() takes an array of x's, so the integral is done in one go.
 
 
 def e_geo(x, d=0):
     d /= 2
-    a = unumpy.sqrt(x**2 + (2 - d) ** 2)
+    a = np.sqrt(x**2 + (2 - d) ** 2)
     # Look at geometric_efficiency.png to see what these mean
-    h1 = ufloat(2,0.1)
-    h2 = ufloat(3,0.1)
-    w1 = ufloat(22, 0.1)
-    w2 = ufloat(30, 0.1)
-
-    if x < 8:
-        c = unumpy.sqrt(((w1 + w2) / 2)**2 + (h2 - h1)**2)
-        b = unumpy.sqrt((h2 - d)**2 + ((w1 + w2) / 2 - x)**2)
-    else:
-        c = w1
-        b = unumpy.sqrt((w1 - x)**2 + (h1 - d)**2)
-    theta = unumpy.arccos((a**2 + b**2 - c**2) / (2 * a * b))
-    return (1 - unumpy.cos(theta / 2)) / 2
-
-
-area = np.pi * ufloat(11, 0.1)**2 / 4
+    # (every x gets its own measurement of these)
+    h1 = floatEC(np.full(np.shape(x), 2.), 0.1)
+    h2 = floatEC(np.full(np.shape(x), 3.), 0.1)
+    w1 = floatEC(np.full(np.shape(x), 22.), 0.1)
+    w2 = floatEC(np.full(np.shape(x), 30.), 0.1)
+
+    # x < 8 and x >= 8 have a different geometry
+    c = np.where(x < 8, np.sqrt(((w1 + w2) / 2)**2 + (h2 - h1)**2), w1)
+    b = np.where(x < 8, np.sqrt((h2 - d)**2 + ((w1 + w2) / 2 - x)**2),
+                 np.sqrt((w1 - x)**2 + (h1 - d)**2))
+    theta = np.arccos((a**2 + b**2 - c**2) / (2 * a * b))
+    return (1 - np.cos(theta / 2)) / 2
+
+
+area = np.pi * floatEC(11, 0.1)**2 / 4
 ds = carbonate_mass / (2.43 * area) * 100  # mm
 e_gs = [0] * 6
 
@@ -64,33 +59,31 @@ ntries = 1000
 for i, d in enumerate(ds):
     # Integrate
     xs = np.linspace(0, 11, ntries)
-    e_g = sum([e_geo(x, d=d) * 11 / ntries for x in xs]) / 11
-    e_gs[i] = ufloat(e_g.n, e_g.s, tag="e_g")
+    e_g = np.sum(e_geo(xs, d=d) * 11 / ntries) / 11
+    e_gs[i] = e_g
     print(e_g)
+e_gs = floatEC([x.val for x in e_gs], [x.error for x in e_gs], tag="e_g")
 print(f"{e_gs}")
 
 # The intrinsic efficiency, from the Sr-90 project
-e_i_avg = ufloat(0.386, 0.029, tag="e_i")
+e_i_avg = floatEC(0.386, 0.029, tag="e_i")
 print(f"{e_i_avg = }")
 
 # Counts, as given
-N_counts = unumpy.uarray(
-    df['counts'] - 159, np.sqrt(df['counts']) + np.sqrt(159))[1:]
-
-for x in N_counts:
-    x.tag = "N_c"
+N_counts = floatEC(
+    df['counts'] - 159, np.sqrt(df['counts']) + np.sqrt(159), tag="N_c")[1:]
 
 
 # Linear range correction, => lindracht.py
-slope = ufloat(1342.2511926817513, 61.0286551244589, tag="alpha")
+slope = floatEC(1342.2511926817513, 61.0286551244589, tag="alpha")
 
 N_counts_rc = carbonate_mass * slope
 
 print(f"{N_counts = }")
 print(f"{N_counts_rc = }")
 
-n = ufloat(0.8928, 0.001, tag="n")
-delta_t = ufloat(600, 1, tag="dt")
+n = floatEC(0.8928, 0.001, tag="n")
+delta_t = floatEC(600, 1, tag="dt")
 
 
 taus = np.log(2) * N_K_active * delta_t * n * e_i_avg * e_gs / N_counts
@@ -109,9 +102,9 @@ print(f"Tau: {np.mean(taus_rc) } Gy")
 # composition of error on tau
 total = 0
 print("Variable    std dtau_component")
-for (var, error) in sorted(taus_rc[0].error_components().items(), key=lambda x: x[1], reverse=True):
-    print(f"{str(var.tag).rjust(8)} {str(round(var.s, 3)).rjust(6)} {error}")
-    total += error**2
+for (var, component) in sorted(taus_rc[0].error_components().items(), key=lambda x: x[1], reverse=True):
+    print(f"{str(var.tag).rjust(8)} {str(round(var.error, 3)).rjust(6)} {component}")
+    total += component**2
 
 # Plot of every datapoint
 plt.rcParams.update({
@@ -122,10 +115,10 @@ plt.rcParams.update({
     "font.weight": 600,
 })
 
-plt.errorbar(df['carbonate_mass'][1:], unumpy.nominal_values(
-    taus), yerr=unumpy.std_devs(taus), label='Vanilla counts', c='#0377fc')
-plt.errorbar(df['carbonate_mass'][1:], unumpy.nominal_values(
-    taus_rc), yerr=unumpy.std_devs(taus_rc),
+plt.errorbar(df['carbonate_mass'][1:], val(
+    taus), yerr=error(taus), label='Vanilla counts', c='#0377fc')
+plt.errorbar(df['carbonate_mass'][1:], val(
+    taus_rc), yerr=error(taus_rc),
     label='Drachtsgecorigeerde counts', c='#fca103')
 
 plt.title("Halfwaardetijden", fontsize=20, fontweight=1000)
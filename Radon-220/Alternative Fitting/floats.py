@@ -70,13 +70,13 @@ class floatE:
             return floatE(self.val - a, self.error)
 
     def __rsub__(self, a):
-        return floatE(self.val - a, self.error)
+        return floatE(a - self.val, self.error)
 
     def __mul__(self, a):
         try:
             return floatE(self.val * a.val, np.sqrt((self.val * a.error)**2 + (a.val * self.error)**2))
         except AttributeError:
-            return floatE(self.val * a, self.error * a)
+            return floatE(self.val * a, self.error * abs(a))
 
     def __rmul__(self, a):
         return floatE(self.val * a, self.error * abs(a))
@@ -85,10 +85,10 @@ class floatE:
         try:
             return floatE(self.val / a.val, np.sqrt((self.error / a.val)**2 + (self.val * a.error / a.val**2)**2))
         except AttributeError:
-            return floatE(self.val / a, self.error / a)
+            return floatE(self.val / a, self.error / abs(a))
 
     def __rtruediv__(self, a):
-        return floatE(a / self.val, a * self.error / self.val**2)
+        return floatE(a / self.val, abs(a * self.error / self.val**2))
 
     def __pow__(self, a):
         try:
@@ -96,7 +96,7 @@ class floatE:
                             2 + (np.log(self.val) * self.val**a.val * a.error) ** 2)
             return floatE(self.val**a.val, error)
         except AttributeError:  # `a` is a regular float
-            return floatE(self.val**a, a * self.val * (a - 1) * self.error)
+            return floatE(self.val**a, abs(a * self.val**(a - 1) * self.error))
 
     def __rpow__(self, a):  # a^self
         return floatE(a ** self.val, abs(np.log(a) * a**self.val * self.error))
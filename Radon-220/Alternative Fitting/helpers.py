@@ -1,5 +1,8 @@
 import time
 
+import numpy as np
+from scipy import stats
+
 
 def timeit(function):
     def timed(*args, **kwargs):
@@ -22,8 +25,23 @@ def power(x):
     return power_string
 
 
-def chi_squared(f, xs, ys, errors):
-    return sum([((y - f(x)) / error)**2 for x, y, error in zip(xs, ys, errors)])
+def chi_squared(f, xs, ys, errors, n_params=None):
+    """Returns the χ² of model `f' on the data. `f' is called once on the whole xs array,
+    or per point if it does not support arrays.
+    If the number of fitted parameters `n_params' is given, returns (χ², reduced χ², degrees of freedom, p-value).
+    """
+    xs, ys, errors = np.asarray(xs), np.asarray(ys, dtype=float), np.asarray(errors, dtype=float)
+    try:
+        model = np.asarray(f(xs), dtype=float)
+        if model.shape not in (ys.shape, ()):
+            raise ValueError("f does not work on arrays")
+    except (TypeError, ValueError):
+        model = np.fromiter((f(x) for x in xs), dtype=float, count=len(xs))
+    chi2 = float(np.sum(((ys - model) / errors)**2))
+    if n_params is None:
+        return chi2
+    dof = len(ys) - n_params
+    return chi2, chi2 / dof, dof, float(stats.chi2.sf(chi2, dof))
 
 
 class ParamDict(dict):
@@ -1,6 +1,10 @@
 import numpy as np
-from scipy import optimize
+import pandas as pd
+from scipy import optimize, stats
 import inspect
+from math import hypot
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 fix_ascii = True
 
@@ -30,11 +34,29 @@ def power(x):
     return power_string
 
 
-def chi_squared(f, xs, ys, errors):
-    return sum([((y - f(x)) / error)**2 for x, y, error in zip(xs, ys, errors)])
+def chi_squared(f, xs, ys, errors, n_params=None):
+    """Returns the χ² of model `f' on the data. `f' is called once on the whole xs array,
+    or per point if it does not support arrays.
+    If the number of fitted parameters `n_params' is given, returns (χ², reduced χ², degrees of freedom, p-value).
+    """
+    xs, ys, errors = np.asarray(xs), np.asarray(ys, dtype=float), np.asarray(errors, dtype=float)
+    try:
+        model = np.asarray(f(xs), dtype=float)
+        if model.shape not in (ys.shape, ()):
+            raise ValueError("f does not work on arrays")
+    except (TypeError, ValueError):
+        model = np.fromiter((f(x) for x in xs), dtype=float, count=len(xs))
+    chi2 = float(np.sum(((ys - model) / errors)**2))
+    if n_params is None:
+        return chi2
+    dof = len(ys) - n_params
+    return chi2, chi2 / dof, dof, float(stats.chi2.sf(chi2, dof))
 
 
 class ParamDict(dict):
+    # {param_name: (lower, upper)} of the bootstrap percentile intervals, None for other fit methods
+    intervals = None
+
     def __repr__(self):
         total_str = ""
         for name, param in self.items():
@@ -43,13 +65,13 @@ class ParamDict(dict):
 
 
 def val(x):
-    if isinstance(x, floatE):
+    if isinstance(x, (floatE, floatEArray, floatEC)):
         return x.val
     return x
 
 
 def error(x):
-    if isinstance(x, floatE):
+    if isinstance(x, (floatE, floatEArray, floatEC)):
         return x.error
     return 0
 
@@ -59,6 +81,8 @@ class floatE:
     arithmetic operations +, -, *, /, **.
     """
 
+    __slots__ = ('val', 'error')
+
     def __init__(self, val, error):
         assert error >= 0, f"The error ({error}) must be greater than 0!"
         self.val = val
@@ -69,6 +93,11 @@ class floatE:
         return str(self)
 
     def __str__(self):
+        # Handling some special cases
+        if self.error == 0:
+            return f"{self.val} \u00B1 0"
+        if self.val == 0:
+            return f"0 \u00B1 {self.error:.2g}"
         val_order = int(np.floor(np.log10(abs(self.val))))
         error_order = int(np.floor(np.log10(self.error)))
         if abs(val_order) >= 4:  # compounded scientific notation
@@ -102,70 +131,820 @@ class floatE:
             return rf"{self.val} \pm {self.error}"
 
     def __add__(self, a):
-        try:
-            return floatE(self.val + a.val, self.error + a.error)
-        except AttributeError:
-            return floatE(self.val + a, self.error)
+        if isinstance(a, floatE):
+            return _new_floatE(self.val + a.val, self.error + a.error)
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val + a, self.error)
+        return NotImplemented
 
     def __radd__(self, a):
-        return floatE(self.val + a, self.error)
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val + a, self.error)
+        return NotImplemented
 
     def __sub__(self, a):
-        try:
+        if isinstance(a, floatE):
             if self is a:
-                return floatE(0,0)
-            return floatE(self.val - a.val, self.error + a.error)
-        except AttributeError:
-            return floatE(self.val - a, self.error)
+                return _new_floatE(0, 0)
+            return _new_floatE(self.val - a.val, self.error + a.error)
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val - a, self.error)
+        return NotImplemented
 
     def __rsub__(self, a):
-        return floatE(self.val - a, self.error)
+        if isinstance(a, _EXACT):
+            return _new_floatE(a - self.val, self.error)
+        return NotImplemented
 
     def __mul__(self, a):
-        try:
-            return floatE(self.val * a.val, np.sqrt((self.val * a.error)**2 + (a.val * self.error)**2))
-        except AttributeError:
-            return floatE(self.val * a, self.error * a)
+        if isinstance(a, floatE):
+            return _new_floatE(self.val * a.val, hypot(self.val * a.error, a.val * self.error))
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val * a, self.error * abs(a))
+        return NotImplemented
 
     def __rmul__(self, a):
-        return floatE(self.val * a, self.error * abs(a))
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val * a, self.error * abs(a))
+        return NotImplemented
 
     def __truediv__(self, a):
-        try:
-            return floatE(self.val / a.val, np.sqrt((self.error / a.val)**2 + (self.val * a.error / a.val**2)**2))
-        except AttributeError:
-            return floatE(self.val / a, self.error / a)
+        if isinstance(a, floatE):
+            return _new_floatE(self.val / a.val, hypot(self.error / a.val, self.val * a.error / a.val**2))
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val / a, self.error / abs(a))
+        return NotImplemented
 
     def __rtruediv__(self, a):
-        return floatE(a / self.val, a * self.error / self.val**2)
+        if isinstance(a, _EXACT):
+            return _new_floatE(a / self.val, abs(a * self.error / self.val**2))
+        return NotImplemented
 
     def __pow__(self, a):
-        try:
-            error = np.sqrt((a.val * self.val**(a.val - 1) * self.error) **
-                            2 + (np.log(self.val) * self.val**a.val * a.error) ** 2)
-            return floatE(self.val**a.val, error)
-        except AttributeError:  # `a` is a regular float
-            return floatE(self.val**a, abs(a * self.val * (a - 1) * self.error))
+        if isinstance(a, floatE):
+            error = hypot(a.val * self.val**(a.val - 1) * self.error,
+                          np.log(self.val) * self.val**a.val * a.error)
+            return _new_floatE(self.val**a.val, error)
+        if isinstance(a, _EXACT):
+            return _new_floatE(self.val**a, abs(a * self.val**(a - 1) * self.error))
+        return NotImplemented
 
     def __rpow__(self, a):  # a^self
-        return floatE(a ** self.val, abs(np.log(a) * a**self.val * self.error))
+        if isinstance(a, _EXACT):
+            return _new_floatE(a ** self.val, abs(np.log(a) * a**self.val * self.error))
+        return NotImplemented
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __abs__(self):
+        return np.absolute(self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        return _array_ufunc(ufunc, method, inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        return _array_function(func, args, kwargs)
+
+
+# The operand types floatE treats as exact numbers. Anything else (numpy arrays, floatEArray, floatEC)
+# gets NotImplemented, so Python or numpy hands the operation to the other operand.
+_EXACT = (int, float, np.number)
+_object_new = object.__new__
+
+
+def _new_floatE(val, error):
+    """Fast floatE constructor for results of the error propagation, skips the validation of __init__."""
+    new = _object_new(floatE)
+    new.val = val
+    new.error = error
+    return new
+
+
+def _val_error(a):
+    """Splits `a' into (values, errors). Anything that is not a floatE(Array) is exact."""
+    if isinstance(a, floatEC):
+        raise TypeError("floatEC's keep track of correlations, they cannot be mixed with floatE's.")
+    if isinstance(a, (floatE, floatEArray)):
+        return a.val, a.error
+    return np.asarray(a, dtype=np.float64), 0.
+
+
+class floatEArray:
+    """An array of floats with errors, stored as two contiguous float64 arrays `val' and `error'.
+    Does the same error propagation as floatE during the arithmetic operations +, -, *, /, **,
+    but on the whole array at once. Broadcasts like a regular numpy array.
+    Indexing with an integer returns a floatE, slicing returns a floatEArray.
+    The operands are treated as independent, so x - x keeps the error; use floatEC for correlated values.
+    """
+
+    def __init__(self, val, error):
+        val = np.asarray(val, dtype=np.float64)
+        error = np.asarray(error, dtype=np.float64)
+        assert np.all(error >= 0), f"The errors ({error}) must be greater than 0!"
+        self.val, self.error = np.broadcast_arrays(val, error)
+        # broadcast_arrays returns read-only views
+        self.val, self.error = np.ascontiguousarray(self.val), np.ascontiguousarray(self.error)
+
+    @classmethod
+    def from_floatEs(cls, xs):
+        """Creates a floatEArray from an iterable of floatE's."""
+        xs = list(xs)
+        return cls([x.val for x in xs], [x.error for x in xs])
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[" + ", ".join(str(x) for x in self) + "]"
+
+    @property
+    def shape(self):
+        return self.val.shape
+
+    def __len__(self):
+        return len(self.val)
+
+    def __getitem__(self, key):
+        val, error = self.val[key], self.error[key]
+        if np.ndim(val) == 0:
+            return floatE(float(val), float(error))
+        return floatEArray(val, error)
+
+    def __iter__(self):
+        for val, error in zip(self.val.tolist(), self.error.tolist()):
+            yield floatE(val, error)
+
+    def __add__(self, a):
+        a_val, a_error = _val_error(a)
+        return floatEArray(self.val + a_val, self.error + a_error)
+
+    def __radd__(self, a):
+        return self + a
+
+    def __sub__(self, a):
+        a_val, a_error = _val_error(a)
+        return floatEArray(self.val - a_val, self.error + a_error)
+
+    def __rsub__(self, a):
+        a_val, a_error = _val_error(a)
+        return floatEArray(a_val - self.val, self.error + a_error)
+
+    def __mul__(self, a):
+        a_val, a_error = _val_error(a)
+        return floatEArray(self.val * a_val, np.hypot(self.val * a_error, a_val * self.error))
+
+    def __rmul__(self, a):
+        return self * a
+
+    def __truediv__(self, a):
+        a_val, a_error = _val_error(a)
+        return floatEArray(self.val / a_val,
+                           np.hypot(self.error / a_val, self.val * a_error / a_val**2))
+
+    def __rtruediv__(self, a):
+        a_val, a_error = _val_error(a)
+        return floatEArray(a_val / self.val,
+                           np.hypot(a_error / self.val, a_val * self.error / self.val**2))
+
+    def __pow__(self, a):
+        a_val, a_error = _val_error(a)
+        val = self.val**a_val
+        error = np.abs(a_val * self.val**(a_val - 1) * self.error)
+        if isinstance(a, (floatE, floatEArray)):  # log(val) is only needed when `a' has an error
+            error = np.hypot(error, np.log(self.val) * val * a_error)
+        return floatEArray(val, error)
+
+    def __rpow__(self, a):  # a^self
+        a_val, a_error = _val_error(a)
+        val = a_val**self.val
+        error = np.abs(np.log(a_val) * val * self.error)
+        if isinstance(a, floatE):
+            error = np.hypot(error, self.val * a_val**(self.val - 1) * a_error)
+        return floatEArray(val, error)
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __abs__(self):
+        return np.absolute(self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        return _array_ufunc(ufunc, method, inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        return _array_function(func, args, kwargs)
+
+
+# Numpy support: np.exp(x), np.sqrt(x), etc. propagate the error using the analytic derivative,
+# d(f(x)) = |f'(x)| dx (floatEC keeps the sign). The binary ufuncs (np.power(x, y), etc.) use the operators defined above.
+_UFUNC_DERIVATIVES = {
+    np.exp: np.exp,
+    np.log: lambda x: 1 / x,
+    np.log10: lambda x: 1 / (x * np.log(10)),
+    np.log2: lambda x: 1 / (x * np.log(2)),
+    np.sqrt: lambda x: 0.5 / np.sqrt(x),
+    np.square: lambda x: 2 * x,
+    np.sin: np.cos,
+    np.cos: lambda x: -np.sin(x),
+    np.tan: lambda x: 1 / np.cos(x)**2,
+    np.arcsin: lambda x: 1 / np.sqrt(1 - x**2),
+    np.arccos: lambda x: -1 / np.sqrt(1 - x**2),
+    np.arctan: lambda x: 1 / (1 + x**2),
+    np.sinh: np.cosh,
+    np.cosh: np.sinh,
+    np.tanh: lambda x: 1 / np.cosh(x)**2,
+    np.negative: lambda x: -np.ones_like(x),
+    np.positive: np.ones_like,
+    np.absolute: np.sign,
+}
+
+_UFUNC_OPERATORS = {
+    np.add: "add",
+    np.subtract: "sub",
+    np.multiply: "mul",
+    np.true_divide: "truediv",
+    np.power: "pow",
+}
+
+
+def _wrap(val, error):
+    """Returns a floatE for 0-dimensional results, a floatEArray otherwise."""
+    if np.ndim(val) == 0:
+        return floatE(float(val), float(error))
+    return floatEArray(val, error)
+
+
+def _array_ufunc(ufunc, method, inputs, kwargs):
+    if method != "__call__" or kwargs:  # out=, where=, reduce, etc. are not supported
+        return NotImplemented
+
+    if ufunc in _UFUNC_DERIVATIVES:
+        x, = inputs
+        return _wrap(ufunc(x.val), np.abs(_UFUNC_DERIVATIVES[ufunc](x.val)) * x.error)
+
+    if ufunc in _UFUNC_OPERATORS:
+        name = _UFUNC_OPERATORS[ufunc]
+        a, b = inputs
+        # A floatE combined with an array broadcasts to a floatEArray
+        if any(isinstance(x, floatEArray) or np.ndim(val(x)) > 0 for x in inputs):
+            a, b = [floatEArray(x.val, x.error) if isinstance(x, floatE) else x for x in inputs]
+            if isinstance(a, floatEArray):
+                return getattr(a, f"__{name}__")(b)
+            return getattr(b, f"__r{name}__")(a)
+        # 0-dimensional arrays are exact numbers to floatE
+        a, b = [float(x) if isinstance(x, np.ndarray) else x for x in inputs]
+        if isinstance(a, floatE):
+            return getattr(a, f"__{name}__")(b)
+        return getattr(b, f"__r{name}__")(a)
+
+    return NotImplemented
+
+
+_HANDLED_FUNCTIONS = {}
+
+
+def _implements(numpy_function):
+    """Registers an __array_function__ implementation for floatE and floatEArray."""
+    def decorator(func):
+        _HANDLED_FUNCTIONS[numpy_function] = func
+        return func
+    return decorator
+
+
+def _array_function(func, args, kwargs):
+    if func not in _HANDLED_FUNCTIONS:
+        return NotImplemented
+    return _HANDLED_FUNCTIONS[func](*args, **kwargs)
+
+
+@_implements(np.shape)
+def _shape(a):
+    return np.shape(val(a))
+
 
+@_implements(np.ndim)
+def _ndim(a):
+    return np.ndim(val(a))
 
-def better_curve_fit(f, xdata, ydata, p0=None, sigma=None, **kwargs):
+
+@_implements(np.size)
+def _size(a, axis=None):
+    return np.size(val(a), axis)
+
+
+@_implements(np.sum)
+def _sum(a, axis=None):
+    # Same rule as floatE.__add__, the errors add up.
+    return _wrap(np.sum(val(a), axis=axis), np.sum(error(a) + np.zeros_like(val(a)), axis=axis))
+
+
+@_implements(np.mean)
+def _mean(a, axis=None):
+    return _sum(a, axis=axis) / (np.size(val(a)) if axis is None else np.shape(val(a))[axis])
+
+
+@_implements(np.concatenate)
+def _concatenate(arrays, axis=0):
+    return floatEArray(np.concatenate([np.atleast_1d(val(a)) for a in arrays], axis=axis),
+                       np.concatenate([np.atleast_1d(error(a) + np.zeros_like(val(a))) for a in arrays], axis=axis))
+
+
+class floatEC:
+    """Float with errors, that also keeps track of correlations (linear error propagation).
+    Every value stores the error contributions of the independent variables it depends on, as sparse
+    (element, variable, contribution) index/value arrays. So x - x = 0 ± 0, and (x + y) / 2 with
+    correlated x and y gets the right error. Works for single values and (numpy broadcasted) arrays.
+
+    floatEC(val, error, tag) creates new independent variables, one for each element of `val'.
+    Supports +, -, *, /, **, the numpy ufuncs of floatE and np.sum, np.mean and np.where.
+    """
+
+    # The id of the next independent variable, every floatEC(val, error) takes a range of val.size ids.
+    _next_id = 0
+
+    def __init__(self, val, error, tag=None):
+        val = np.asarray(val, dtype=np.float64)
+        error = np.broadcast_to(np.asarray(error, dtype=np.float64), val.shape).ravel()
+        assert np.all(error >= 0), f"The errors ({error}) must be greater than 0!"
+        variables = _Variables(floatEC._next_id, val.ravel().copy(), error.copy(), tag)
+        floatEC._next_id += val.size
+        ids = np.arange(variables.first_id, variables.first_id + val.size)
+        self._set(val, np.arange(val.size), ids, error.copy(), {variables.first_id: variables})
+        self.tag = tag
+
+    @classmethod
+    def _new(cls, val, rows, cols, derivs, sources):
+        new = cls.__new__(cls)
+        new._set(np.asarray(val, dtype=np.float64), rows, cols, derivs, sources)
+        new.tag = None
+        return new
+
+    def _set(self, val, rows, cols, derivs, sources):
+        self.val = float(val) if val.ndim == 0 else val
+        self.shape = val.shape
+        self.size = val.size
+        # Element `rows[i]' depends on variable `cols[i]' with error contribution `derivs[i]'.
+        self._rows, self._cols, self._derivs = rows, cols, derivs
+        # The _Variables the derivatives refer to, by first id. They are freed with the last floatEC using them.
+        self._sources = sources
+
+    @property
+    def error(self):
+        error = np.sqrt(np.bincount(self._rows, weights=self._derivs**2, minlength=self.size))
+        if self.shape == ():
+            return float(error[0])
+        return error.reshape(self.shape)
+
+    def error_components(self):
+        """Returns {independent variable: error contribution} of a single floatEC."""
+        assert self.shape == (), "Only a single floatEC has error components."
+        components = {}
+        for var_id, derivative in zip(self._cols.tolist(), self._derivs.tolist()):
+            variables = next(variables for first_id, variables in self._sources.items()
+                             if first_id <= var_id < first_id + variables.val.size)
+            index = var_id - variables.first_id
+            variable = floatEC._new(variables.val[index], np.zeros(1, dtype=int), np.array([var_id]),
+                                    variables.error[index:index + 1], {variables.first_id: variables})
+            variable.tag = variables.tag
+            components[variable] = abs(derivative)
+        return components
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        if self.shape == ():
+            return str(floatE(self.val, self.error))
+        return "[" + ", ".join(str(x) for x in self) + "]"
+
+    def _broadcast(self, shape):
+        """Returns (rows, cols, derivs) of this floatEC, broadcasted to `shape'."""
+        if shape == self.shape:
+            return self._rows, self._cols, self._derivs
+        source = np.broadcast_to(np.arange(self.size).reshape(self.shape), shape)
+        return _gather(self._rows, self._cols, self._derivs, source.ravel(), self.size)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        source = np.arange(self.size).reshape(self.shape)[key]
+        rows, cols, derivs = _gather(self._rows, self._cols, self._derivs, np.ravel(source), self.size)
+        return floatEC._new(np.asarray(self.val)[key], rows, cols, derivs, self._sources)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __add__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        a_val = _value(a)
+        return _chain(self.val + a_val, (self, 1.), (a, 1.))
+
+    def __radd__(self, a):
+        return self + a
+
+    def __sub__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        a_val = _value(a)
+        return _chain(self.val - a_val, (self, 1.), (a, -1.))
+
+    def __rsub__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        return _chain(_value(a) - self.val, (self, -1.))
+
+    def __mul__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        a_val = _value(a)
+        return _chain(self.val * a_val, (self, a_val), (a, self.val))
+
+    def __rmul__(self, a):
+        return self * a
+
+    def __truediv__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        a_val = _value(a)
+        return _chain(self.val / a_val, (self, 1 / a_val), (a, -self.val / a_val**2))
+
+    def __rtruediv__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        a_val = _value(a)
+        return _chain(a_val / self.val, (self, -a_val / self.val**2))
+
+    def __pow__(self, a):
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        a_val = _value(a)
+        result = self.val**a_val
+        if isinstance(a, floatEC):  # log(val) is only needed when `a' has an error
+            return _chain(result, (self, a_val * self.val**(a_val - 1)), (a, np.log(self.val) * result))
+        return _chain(result, (self, a_val * self.val**(a_val - 1)))
+
+    def __rpow__(self, a):  # a^self
+        if isinstance(a, (floatE, floatEArray)):
+            return NotImplemented
+        result = _value(a)**self.val
+        return _chain(result, (self, np.log(_value(a)) * result))
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __abs__(self):
+        return np.absolute(self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs:
+            return NotImplemented
+        if ufunc in _UFUNC_DERIVATIVES:
+            x, = inputs
+            return _chain(ufunc(x.val), (x, _UFUNC_DERIVATIVES[ufunc](x.val)))
+        if ufunc in _UFUNC_OPERATORS:
+            name = _UFUNC_OPERATORS[ufunc]
+            a, b = inputs
+            if isinstance(a, floatEC):
+                return getattr(a, f"__{name}__")(b)
+            return getattr(b, f"__r{name}__")(a)
+        return NotImplemented
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func not in _CORRELATED_FUNCTIONS:
+            return NotImplemented
+        return _CORRELATED_FUNCTIONS[func](*args, **kwargs)
+
+
+class _Variables:
+    """The values, errors and tag of the independent variables first_id, first_id + 1, ... of one floatEC(val, error)."""
+    __slots__ = ("first_id", "val", "error", "tag")
+
+    def __init__(self, first_id, val, error, tag):
+        self.first_id, self.val, self.error, self.tag = first_id, val, error, tag
+
+
+def _value(a):
+    if isinstance(a, floatEC):
+        return a.val
+    return np.asarray(a, dtype=np.float64)
+
+
+def _gather(rows, cols, derivs, source, size):
+    """Sparse version of derivs[source]: element i of the result gets the entries of element source[i]."""
+    order = np.argsort(source, kind="stable")
+    counts = np.bincount(source, minlength=size)
+    starts = np.cumsum(counts) - counts
+    repeats = counts[rows]
+    offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    new_rows = order[np.repeat(starts[rows], repeats) + offsets]
+    return new_rows, np.repeat(cols, repeats), np.repeat(derivs, repeats)
+
+
+def _compact(rows, cols, derivs):
+    """Adds up the contributions of the same (element, variable) pair, drops the zeros."""
+    # Numbered locally, so the keys stay below (elements * variables involved)
+    ids, local = np.unique(cols, return_inverse=True)
+    keys, inverse = np.unique(rows * len(ids) + local, return_inverse=True)
+    derivs = np.bincount(inverse, weights=derivs)
+    nonzero = derivs != 0
+    rows, local = np.divmod(keys[nonzero], len(ids))
+    return rows, ids[local], derivs[nonzero]
+
+
+def _chain(val, *terms):
+    """The chain rule: returns a floatEC with value `val', and derivatives
+    sum(derivative * x.derivatives for x, derivative in terms). Exact (non floatEC) x's are skipped.
+    """
+    val = np.asarray(val, dtype=np.float64)
+    parts = []
+    sources = {}
+    for x, derivative in terms:
+        if not isinstance(x, floatEC):
+            continue
+        rows, cols, derivs = x._broadcast(val.shape)
+        factors = np.broadcast_to(derivative, val.shape).ravel()[rows]
+        keep = factors != 0
+        parts.append((rows[keep], cols[keep], derivs[keep] * factors[keep]))
+        sources.update(x._sources)
+    if len(parts) == 1:
+        return floatEC._new(val, *parts[0], sources)
+    return floatEC._new(val, *_compact(*[np.concatenate(part) for part in zip(*parts)]), sources)
+
+
+def _correlated_sum(a, axis=None):
+    assert axis is None, "floatEC only supports summing over all elements."
+    rows, cols, derivs = _compact(np.zeros_like(a._rows), a._cols, a._derivs)
+    return floatEC._new(np.sum(a.val), rows, cols, derivs, a._sources)
+
+
+def _correlated_where(condition, x, y):
+    # The derivatives of x where the condition holds, those of y elsewhere.
+    condition = np.asarray(condition, dtype=bool)
+    return _chain(np.where(condition, _value(x), _value(y)), (x, condition), (y, ~condition))
+
+
+_CORRELATED_FUNCTIONS = {
+    np.sum: _correlated_sum,
+    np.mean: lambda a, axis=None: _correlated_sum(a, axis) / a.size,
+    np.where: _correlated_where,
+    np.shape: lambda a: a.shape,
+    np.ndim: lambda a: len(a.shape),
+    np.size: lambda a: a.size,
+}
+
+
+def better_curve_fit(f, xdata, ydata, p0=None, sigma=None, jac=None, **kwargs):
     """
     A modified version of curve_fit which returns more useful information.
+    `jac' is the analytic Jacobian of f, jac(x, *params) with shape (len(x), len(params)).
+    It defaults to the registered Jacobian for the built-in models (see with_jacobian()),
+    which saves the finite difference function evaluations.
+    The signature of f is only inspected the first time (see FitModel), the result buffers are
+    allocated per call, so better_curve_fit can be called from several threads.
     Returns:
         - params: a dictionary of paramters in the form of {param_name: value pm error}
         - chi2: The overal χ^2, assuming a sigma has been given.
 
     """
-    popt, pcov = optimize.curve_fit(
-        f, xdata, ydata, p0=p0, sigma=sigma, **kwargs)
-    argspec = inspect.getfullargspec(f)
-    params = ParamDict({param: floatE(val, error)
-                        for param, val, error in zip(argspec[0][1:], popt, np.sqrt(np.diag(pcov)))})
-    if sigma.any():
-        chi2 = chi_squared(lambda x: f(x, *popt), xdata, ydata,
-                           sigma) / (len(xdata) - len(popt))
+    return FitModel(f).fit(xdata, ydata, sigma, p0=p0, jac=jac, **kwargs)
+
+
+class FitModel:
+    """A model prepared for fitting: the parameter names, defaults, bounds and Jacobian of `f' are
+    resolved once. Use this when fitting the same model many times (bootstrapping, fits per column, etc.).
+    Usage:
+        model = FitModel(exp_decay, p0=(0.01, 1000, 10))
+        params, chi2 = model.fit(ts, Ns, np.sqrt(Ns))
+    Note: the result buffers are reused, so one FitModel should not be shared between threads.
+    """
+
+    def __init__(self, f, p0=None, bounds=(-np.inf, np.inf), jac=None):
+        param_names, default_p0, registered_jac = _signature(f)
+        self.f = f
+        self.param_names = list(param_names)
+        # The signature defaults (default_p0) are moved into the bounds when fitting, a given p0 is used as is
+        self._default_p0 = p0 is None
+        p0 = default_p0 if p0 is None else p0
+        self.p0 = None if p0 is None else np.array(p0, dtype=float)
+        self.bounds = bounds
+        self.jac = jac if jac is not None else registered_jac
+
+        self._errors = np.empty(len(self.param_names))
+        self._residuals = np.empty(0)
+
+    def fit(self, x, y, sigma=None, p0=None, jac=None, method=None, n_bootstrap=1000, workers=None,
+            seed=None, **kwargs):
+        """Fits the model to (x, y, sigma), returns the same as better_curve_fit.
+        With method='bootstrap', the parameter errors come from `n_bootstrap' fits to datasets resampled
+        with replacement, instead of the covariance matrix. The error is half the width of the central
+        68% percentile interval, the (possibly asymmetric) interval itself is in `params.intervals'
+        as {param_name: (lower, upper)}. The resampled fits start from the best fit, and can be done
+        in a process pool with `workers'. Other methods are passed on to curve_fit.
+        """
+        jac = self.jac if jac is None else jac
+        bounds = kwargs.pop('bounds', self.bounds)
+        if p0 is None and self.p0 is not None:
+            p0 = _into_bounds(self.p0, bounds) if self._default_p0 else self.p0
+        popt, pcov = optimize.curve_fit(
+            self.f, x, y, p0=p0, sigma=sigma, jac=jac, bounds=bounds,
+            method=None if method == 'bootstrap' else method, **kwargs)
+        if method == 'bootstrap':
+            samples = self.bootstrap(x, y, sigma, popt, jac, bounds, n_bootstrap, workers, seed)
+            lower, upper = np.nanpercentile(samples, [15.87, 84.13], axis=0)
+            self._errors[:] = (upper - lower) / 2
+        else:
+            np.sqrt(np.diag(pcov), out=self._errors)
+        params = ParamDict({param: floatE(val, error)
+                            for param, val, error in zip(self.param_names, popt.tolist(), self._errors.tolist())})
+        if method == 'bootstrap':
+            params.intervals = dict(zip(self.param_names, zip(lower.tolist(), upper.tolist())))
+        if sigma is None or not np.any(sigma):
+            return params
+
+        # χ² in the preallocated residual buffer
+        y = np.asarray(y, dtype=float)
+        if self._residuals.shape != y.shape:
+            self._residuals = np.empty(y.shape)
+        np.subtract(y, self.f(np.asarray(x, dtype=float), *popt), out=self._residuals)
+        np.divide(self._residuals, sigma, out=self._residuals)
+        chi2 = float(np.dot(self._residuals.ravel(), self._residuals.ravel())) / (len(y) - len(popt))
         return params, chi2
-    return params
+
+    def bootstrap(self, x, y, sigma, popt, jac=None, bounds=(-np.inf, np.inf), n_bootstrap=1000, workers=None,
+                  seed=None):
+        """Returns the fitted parameters of `n_bootstrap' resampled datasets, shape (n_bootstrap, n_params).
+        Fits that do not converge are nan.
+        """
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        sigma = np.ones_like(y) if sigma is None else np.asarray(sigma, dtype=float)
+        # All resamples at once, one row of indices per resampled dataset.
+        indices = np.random.default_rng(seed).integers(0, len(y), size=(n_bootstrap, len(y)))
+        args = (self.f, jac, bounds, x, y, sigma, popt)
+        if workers is None or workers <= 1:
+            return _bootstrap_chunk(indices, *args)
+        # A few chunks per worker, so that a slow chunk does not keep the others waiting
+        chunks = np.array_split(indices, 4 * workers)
+        with ProcessPoolExecutor(workers) as pool:
+            return np.concatenate(list(pool.map(_bootstrap_chunk, chunks, *[[arg] * len(chunks) for arg in args])))
+
+
+def _bootstrap_chunk(indices, f, jac, bounds, x, y, sigma, popt):
+    lower, upper = bounds
+    bounded = np.any(np.asarray(lower) > -np.inf) or np.any(np.asarray(upper) < np.inf)
+    samples = np.full((len(indices), len(popt)), np.nan)
+    for i, index in enumerate(indices):
+        xs, ys, sigmas = x[index], y[index], sigma[index]
+
+        def residuals(params):
+            return (f(xs, *params) - ys) / sigmas
+
+        def residuals_jac(params):
+            return jac(xs, *params) / sigmas[:, np.newaxis]
+
+        if bounded:
+            result = optimize.least_squares(residuals, popt, jac=residuals_jac if jac else '2-point',
+                                            bounds=bounds)
+            if result.success:
+                samples[i] = result.x
+        else:
+            params, ier = optimize.leastsq(residuals, popt, Dfun=residuals_jac if jac else None)
+            if ier in (1, 2, 3, 4):  # converged
+                samples[i] = params
+    return samples
+
+
+def _resolve_signature(f, hashable=True):
+    """Returns (parameter names, default p0, registered Jacobian) of the model `f'.
+    The default p0 is None if the signature of f has no default values, so curve_fit chooses the start.
+    """
+    argspec = inspect.getfullargspec(f)
+    param_names = tuple(argspec.args[1:])
+    # Default values in the signature of f are the starting point, otherwise 1 (as curve_fit does)
+    defaults = dict(zip(reversed(argspec.args), reversed(argspec.defaults or ())))
+    p0 = None
+    if any(name in defaults for name in param_names):
+        p0 = tuple(defaults.get(name, 1.) for name in param_names)
+    return param_names, p0, _JACOBIANS.get(f) if hashable else None
+
+
+def _into_bounds(p0, bounds):
+    """Replaces the values of `p0' outside of `bounds' by the start curve_fit uses without p0:
+    the middle of a finite interval, 1 inside a one-sided bound, 1 if unbounded."""
+    lower, upper = (np.broadcast_to(np.asarray(bound, dtype=float), p0.shape) for bound in bounds)
+    with np.errstate(invalid='ignore'):  # -inf + inf, not used
+        middle = (lower + upper) / 2
+    start = np.where(np.isfinite(lower) & np.isfinite(upper), middle,
+                     np.where(np.isfinite(lower), lower + 1, np.where(np.isfinite(upper), upper - 1, 1.)))
+    return np.where((p0 < lower) | (p0 > upper), start, p0)
+
+
+@lru_cache(maxsize=128)
+def _cached_signature(f):
+    return _resolve_signature(f)
+
+
+def _signature(f):
+    """_resolve_signature(f), cached per model. Unhashable callables are resolved every time."""
+    try:
+        hash(f)
+    except TypeError:
+        return _resolve_signature(f, hashable=False)
+    return _cached_signature(f)
+
+
+def better_curve_fit_many(f, xs_list, ys_list, sigma_list, p0=None, warm_start=True, workers=None,
+                          labels=None, **kwargs):
+    """
+    Fits the same model `f' to many independent datasets, using better_curve_fit.
+    With `warm_start', every fit starts from the parameters of the previous one (instead of p0).
+    The χ² of a dataset without sigma (None or all zeros) is nan.
+    With `workers' > 1 the datasets are split in chunks that are fitted in a process pool,
+    `f' then has to be a module-level function (so it can be pickled).
+    Returns:
+        - A pandas DataFrame with one row per dataset (index `labels'), with the floatE parameters
+          and the reduced χ². Can be written directly with .to_csv().
+    """
+    datasets = list(zip(xs_list, ys_list, sigma_list))
+    if workers is None or workers <= 1:
+        rows = _fit_chunk(f, datasets, p0, warm_start, kwargs)
+    else:
+        chunks = [chunk for chunk in np.array_split(np.arange(len(datasets)), workers) if len(chunk)]
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_fit_chunk, f, [datasets[i] for i in chunk], p0, warm_start, kwargs)
+                       for chunk in chunks]
+            rows = [row for future in futures for row in future.result()]
+    return pd.DataFrame(rows, index=labels)
+
+
+def _fit_chunk(f, datasets, p0, warm_start, kwargs):
+    rows = []
+    for xs, ys, sigma in datasets:
+        # A sigma of all zeros means no sigma (as in better_curve_fit), the fit is unweighted
+        sigma = np.asarray(sigma) if sigma is not None and np.any(sigma) else None
+        try:
+            result = better_curve_fit(f, xs, ys, p0=p0, sigma=sigma, **kwargs)
+        except RuntimeError:  # No convergence, the other datasets can still be fitted
+            rows.append({"chi2": np.nan})
+            continue
+        # Without sigma (None or all zeros), better_curve_fit returns only the parameters
+        params, chi2 = result if isinstance(result, tuple) else (result, np.nan)
+        rows.append({**params, "chi2": chi2})
+        if warm_start:
+            p0 = [param.val for param in params.values()]
+    return rows
+
+
+# Built-in models, with analytic Jacobians.
+_JACOBIANS = {}
+
+
+def with_jacobian(jac):
+    """Decorator that registers `jac' as the analytic Jacobian of a model, used by better_curve_fit.
+    Usage:
+        @with_jacobian(lambda x, a: np.stack([x], axis=-1))
+        def lin(x, a):
+            return a * x
+    """
+    def decorator(f):
+        _JACOBIANS[f] = jac
+        return f
+    return decorator
+
+
+def _exp_decay_jac(t, lamda, N0, bg):
+    t = np.asarray(t, dtype=float)
+    exp = np.exp(-lamda * t)
+    return np.stack([-N0 * t * exp, exp, np.ones_like(t)], axis=-1)
+
+
+@with_jacobian(_exp_decay_jac)
+def exp_decay(t, lamda, N0, bg):
+    """Exponential decay on top of a constant background, as in Radon-220."""
+    return N0 * np.exp(-lamda * t) + bg
+
+
+def _inverted_gauss_jac(x, sigma, amp, mu, base):
+    x = np.asarray(x, dtype=float)
+    z = (x - mu) / sigma
+    gauss = np.exp(-z**2 / 2)
+    return np.stack([-amp * gauss * z**2 / sigma, -gauss, -amp * gauss * z / sigma, np.ones_like(x)], axis=-1)
+
+
+@with_jacobian(_inverted_gauss_jac)
+def inverted_gauss(x, sigma, amp, mu, base):
+    """A dip of Gaussian shape in a constant base, as in Ultrasoon/width_analysis.py."""
+    return base - amp * np.exp(-((x - mu) / sigma)**2 / 2)
+
+
+def _lin_jac(x, a):
+    return np.stack([np.asarray(x, dtype=float)], axis=-1)
+
+
+@with_jacobian(_lin_jac)
+def lin(x, a):
+    """A straight line through the origin, as in K-40/lindracht.py."""
+    return a * x
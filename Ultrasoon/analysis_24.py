@@ -1,5 +1,4 @@
 import numpy as np
-import pandas as pd
 import os
 
 from matplotlib import pyplot as plt
@@ -7,27 +6,23 @@ import matplotlib.ticker as ticker
 from scipy import signal
 from lmfit import models, Parameter, Parameters
 
+from bscan import load_bscan
+from widths import analyse_profiles
 
-columns = ["index"] + [f"{x:.2f}" for x in np.arange(40, 120.1, 0.2)] + ["t"]
-df = pd.read_csv("meting24/" + "data.csv", names=columns)
 
+scan = load_bscan("meting24/")
 
-# xs = sorted(df.columns)
-df.drop(["index", "t"], axis=1, inplace=True)
+# Total amplitude of samples 200 up to and including 700
+ys = scan.data[:, 200:701].sum(axis=1, dtype=np.float64)
 
-
-
-xs = df.columns
-ys = np.array([sum(df.loc[200:700, x]) for x in xs])
-
-xs_float = np.array([float(x) for x in xs])
+xs_float = scan.positions
 
 fig, (ax1, ax2) = plt.subplots(ncols=2)
 ax2.plot(xs_float, ys)
 # ticks = np.arange(0, 121, 20)
 # ax.set_xticks(ticks)
 
-ax1.imshow(df)
+ax1.imshow(scan.data.T)
 ax1.set_aspect(0.1)
 ax2.set_aspect(0.015)
 
@@ -46,16 +41,12 @@ print("Vector Coëfficiënt:", c_v)
 
 mu = xs_float[ys.argmin()]
 
-half_height = (base_mean + y_min) / 2
-
-# Some smart numpy tricks
-index_hw = np.abs(ys - half_height).argmin()
-x_hw = xs_float[index_hw]
-
-sigma = x_hw - mu
+# Half width half max, with the half height crossings interpolated (see widths.py)
+result = analyse_profiles(xs_float[None, :], ys[None, :], base_window=(-np.inf, 75), method='cubic')
+sigma, sigma_error = result['hwhm'][0], result['hwhm_error'][0]
 
-print("sigma:", sigma)
-ax2.scatter(x_hw, half_height)
+print(f"sigma: {sigma:.3f} ± {sigma_error:.3f} mm")
+ax2.scatter([result['x_left'][0], result['x_right'][0]], [result['half_height'][0]] * 2)
 
 
 
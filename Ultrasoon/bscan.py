@@ -0,0 +1,56 @@
+"""The processed B-scan of a measurement folder, with numeric position and time axes.
+
+Replaces the data.csv intermediate: the envelopes are read from the binary cache (see cache.py) as a
+float32 memmap of shape (positions, samples), with the scan positions (mm), sample times (ms) and
+depths (mm, see depth.py) as float arrays. Selecting a position or time range returns views, nothing is copied.
+Usage:
+    scan = load_bscan("meting24/")
+    part = scan.select(x=(60, 80), t=(0.55, 0.56))
+    part.data.sum(axis=1)  # Total amplitude per position
+"""
+import numpy as np
+import pandas as pd
+
+from cache import load_envelope
+
+
+class BScan:
+    """Envelopes `data' (positions, samples) with the axes `positions', `times' and `depths'."""
+
+    def __init__(self, positions, times, depths, data):
+        self.positions = positions
+        self.times = times
+        self.depths = depths
+        self.data = data
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def select(self, x=None, t=None, depth=None):
+        """Returns the BScan of positions within `x' and samples within `t' or `depth',
+        each an inclusive (min, max) range, `depth' in mm (see depth.py). The arrays are views of this BScan.
+        """
+        xs = _range_slice(self.positions, x)
+        if t is not None and depth is not None:
+            raise ValueError("Select either a time or a depth range, not both!")
+        ts = _range_slice(self.depths, depth) if depth is not None else _range_slice(self.times, t)
+        return BScan(self.positions[xs], self.times[ts], self.depths[ts], self.data[xs, ts])
+
+    def frame(self):
+        """Returns the envelopes as a DataFrame with a column per position, indexed by time."""
+        return pd.DataFrame(self.data.T, index=pd.Index(self.times, name='t'),
+                            columns=pd.Index(self.positions, name='x'), copy=False)
+
+
+def _range_slice(axis, bounds):
+    """The slice of the sorted `axis' within the inclusive (min, max) `bounds'."""
+    if bounds is None:
+        return slice(None)
+    low, high = bounds
+    return slice(np.searchsorted(axis, low, side='left'), np.searchsorted(axis, high, side='right'))
+
+
+def load_bscan(folder, **kwargs):
+    """Returns the BScan of `folder', keyword arguments are passed on to load_envelope."""
+    return BScan(*load_envelope(folder, **kwargs))
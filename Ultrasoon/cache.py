@@ -0,0 +1,119 @@
+"""On-disk cache of processed envelopes, keyed by the raw contents of a measurement folder.
+
+The key is a hash of the names, sizes and modification times of the `<x>.txt' files in the
+folder, together with the processing parameters (offset and velocity, see depth.py) and the
+versions of the envelope and depth computations (envelope.VERSION, depth.VERSION). A cache entry is a
+directory in CACHE_DIR holding `envelope.npy' (positions, samples), `positions.npy', `times.npy'
+(ms) and `depths.npy' (mm). When the raw files change, the key changes and the envelope is
+recomputed; the least recently used entries are removed once the cache exceeds MAX_CACHE_BYTES.
+Folders of which only the old `data.csv' (envelopes and `t' column) is left are read from that file.
+Usage:
+    positions, times, depths, image = load_envelope("meting24/")
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ingest import load_folder, scan_files, fingerprint
+from envelope import envelope, OFFSET, VERSION as ENVELOPE_VERSION
+from depth import depth_axis, VERSION as DEPTH_VERSION
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".envelope_cache")
+MAX_CACHE_BYTES = 1 << 30
+VELOCITY = 1500  # m/s, or a list of (top, speed) layers, see depth.py
+ENTRY_FILES = ("envelope.npy", "positions.npy", "times.npy", "depths.npy")
+LEGACY_FILE = "data.csv"
+
+
+def raw_files(folder):
+    """Returns the `<x>.txt' files of `folder', or its data.csv if there are none."""
+    _, paths = scan_files(folder)
+    if not paths and os.path.exists(os.path.join(folder, LEGACY_FILE)):
+        return [os.path.join(folder, LEGACY_FILE)]
+    if not paths:
+        raise FileNotFoundError(f"No .txt files or {LEGACY_FILE} found in '{folder}'!")
+    return paths
+
+
+def _read_legacy(path):
+    """Reads a data.csv as written by make_image, returns (positions, times, image)."""
+    df = pd.read_csv(path, index_col=0)
+    times = df.pop('t').to_numpy()
+    positions = np.array([float(x) for x in df.columns])
+    order = np.argsort(positions)
+    return positions[order], times, df.to_numpy(np.float32).T[order]
+
+
+def cache_key(folder, offset=OFFSET, velocity=VELOCITY):
+    """Hash of the raw files in `folder' (names, sizes and mtimes), the processing parameters and version."""
+    parameters = f"version={ENVELOPE_VERSION},{DEPTH_VERSION};offset={offset!r};velocity={velocity!r};"
+    return hashlib.sha1((parameters + fingerprint(raw_files(folder))).encode()).hexdigest()
+
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+
+
+def evict(max_bytes=MAX_CACHE_BYTES, keep=None):
+    """Removes the least recently used cache entries (except `keep') until the cache is at most `max_bytes'."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR)]
+    entries = sorted((entry for entry in entries if os.path.isdir(entry)), key=os.path.getmtime)
+    sizes = {entry: _entry_size(entry) for entry in entries}
+    total = sum(sizes.values())
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= sizes[entry]
+
+
+def _compute_entry(folder, entry, offset, velocity):
+    """Computes the envelope of `folder' into a temporary directory, then moves it to `entry'."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temp = f"{entry}.{os.getpid()}.tmp"
+    os.makedirs(temp, exist_ok=True)
+
+    paths = raw_files(folder)
+    if os.path.basename(paths[0]) == LEGACY_FILE:
+        positions, times, image = _read_legacy(paths[0])
+        np.save(os.path.join(temp, "envelope.npy"), image)
+    else:
+        positions, times, scan = load_folder(folder)
+        image = np.lib.format.open_memmap(os.path.join(temp, "envelope.npy"), mode='w+', dtype=np.float32,
+                                          shape=scan.shape)
+        envelope(scan, offset=offset, out=image)
+        image.flush()
+    del image
+    depths = depth_axis(times, velocity)
+
+    np.save(os.path.join(temp, "positions.npy"), positions)
+    np.save(os.path.join(temp, "times.npy"), times)
+    np.save(os.path.join(temp, "depths.npy"), depths)
+    try:
+        os.rename(temp, entry)
+    except OSError:  # Computed concurrently by another process
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def load_envelope(folder, offset=OFFSET, velocity=VELOCITY, max_bytes=MAX_CACHE_BYTES):
+    """Returns (positions, times, depths, image) of `folder', `image' is the read-only float32
+    envelope memmap of shape (positions, samples). Computed and cached if not cached yet.
+    """
+    entry = os.path.join(CACHE_DIR, cache_key(folder, offset, velocity))
+    if not all(os.path.exists(os.path.join(entry, file)) for file in ENTRY_FILES):
+        shutil.rmtree(entry, ignore_errors=True)
+        _compute_entry(folder, entry, offset, velocity)
+        evict(max_bytes, keep=entry)
+    os.utime(entry)  # Marks the entry as recently used
+
+    positions, times, depths = (np.load(os.path.join(entry, file)) for file in ENTRY_FILES[1:])
+    image = np.load(os.path.join(entry, "envelope.npy"), mmap_mode='r')
+    return positions, times, depths, image
@@ -0,0 +1,44 @@
+"""Conversion of the sample times of the A-scans to depth, for a (layered) sound-speed profile.
+
+The depth is the distance to the reflector: the pulse travels there and back, so depth = time of
+flight * speed / 2 (1 m/s = 1 mm/ms).
+The velocity is either a single speed (m/s), or a piecewise profile: a list of (top, speed) layers,
+with the depth (mm) where each layer starts and its speed (m/s), e.g. [(0, 1500), (20, 2700)] for
+20 mm of water on top of aluminium. The time at which each layer is reached follows from the
+cumulative sum of 2 * thickness / speed, the depth axis is then interpolated linearly between those.
+Usage:
+    depths = depth_axis(times, [(0, 1500), (20, 2700)])  # mm, for the times in ms
+"""
+import numpy as np
+
+
+# Part of the cache key (see cache.py), change it whenever a change to this module changes the depth axis
+VERSION = "depth-2"
+
+
+def layers(velocity):
+    """Returns the (tops, speeds) arrays of `velocity', a speed or a list of (top, speed) layers."""
+    if np.ndim(velocity) == 0:
+        return np.array([0.]), np.array([float(velocity)])
+    tops, speeds = np.array(velocity, dtype=float).T
+    if tops[0] != 0 or np.any(np.diff(tops) <= 0) or np.any(speeds <= 0):
+        raise ValueError(f"Invalid sound-speed profile {velocity}, the layer tops should "
+                         f"increase from 0 and the speeds should be positive!")
+    return tops, speeds
+
+
+def depth_axis(times, velocity):
+    """Returns the depth (mm) of each of the sample `times' (ms), measured from times[0]."""
+    tops, speeds = layers(velocity)
+    elapsed = np.asarray(times, dtype=float) - times[0]
+    # The (round-trip) times at which each layer is reached, and a point far into the last layer
+    top_times = np.concatenate([[0], np.cumsum(2 * np.diff(tops) / speeds[:-1])])
+    end_time = max(top_times[-1], elapsed.max()) + 1
+    return np.interp(elapsed, np.append(top_times, end_time),
+                     np.append(tops, tops[-1] + (end_time - top_times[-1]) * speeds[-1] / 2))
+
+
+def sample_range(depths, bounds):
+    """The (start, stop) sample range of the inclusive (min, max) depth `bounds', for the sorted `depths'."""
+    low, high = bounds
+    return int(np.searchsorted(depths, low, side='left')), int(np.searchsorted(depths, high, side='right'))
@@ -0,0 +1,49 @@
+"""Computes the envelope of all A-scans of a B-scan at once.
+
+The envelope is the absolute value of the analytic signal (as in np.abs(signal.hilbert(a_scan - 127))),
+computed with one FFT along axis 1 of the whole (positions, samples) array instead of per A-scan.
+Usage:
+    positions, times, scan = load_folder("meting24/")
+    image = envelope(scan)  # (positions, samples) float32
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import fft
+
+
+OFFSET = 127  # The zero level of the A-scans
+# Part of the cache key (see cache.py), change it whenever a change to this module changes the envelopes
+VERSION = "envelope-2"
+
+
+def _envelope_block(block, offset, n_fft):
+    """Envelope of the rows of `block', in float32 (scipy.fft keeps single precision)."""
+    n = block.shape[1]
+    spectrum = fft.rfft(np.asarray(block, dtype=np.float32) - np.float32(offset), n=n_fft, axis=1)
+    # The analytic signal: positive frequencies doubled, negative frequencies (padded by ifft) zero.
+    spectrum[:, 1:(n_fft + 1) // 2] *= 2
+    return np.abs(fft.ifft(spectrum, n=n_fft, axis=1)[:, :n])
+
+
+def envelope(scan, offset=OFFSET, workers=None, chunk_size=64, out=None):
+    """Returns the envelope of every A-scan (row) of `scan', a (positions, samples) array.
+    The FFT length is padded to a fast size. With `workers', chunks of `chunk_size' rows are
+    processed in a thread pool. `out' can be a preallocated (e.g. memory-mapped) float32 array.
+    """
+    if out is None:
+        out = np.empty(scan.shape, dtype=np.float32)
+    # Only pads lengths that are slow (large prime factors), zero padding slightly changes the envelope
+    n_fft = fft.next_fast_len(scan.shape[1])
+    starts = range(0, len(scan), chunk_size)
+
+    def process(start):
+        out[start:start + chunk_size] = _envelope_block(scan[start:start + chunk_size], offset, n_fft)
+
+    if workers is None or workers <= 1:
+        for start in starts:
+            process(start)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(process, starts))
+    return out
@@ -0,0 +1,61 @@
+"""Depth gated profiles, streamed straight from the `<x>.txt' files of a measurement folder.
+
+Only the rows within the gate (plus a small margin for the envelope) are read from each A-scan,
+and only one value per scan position is kept, so the memory used does not depend on the size of
+the scan. Nothing is ingested or cached, see bscan.py for the full B-scan.
+Usage:
+    positions, ys = gated_profile("meting24/", (200, 701))  # Sum of the envelope over samples 200-700
+    positions, ys = gated_profile("meting24/", (10, 40), unit='mm', reduction=np.max)
+"""
+from itertools import islice
+
+import numpy as np
+
+from ingest import scan_files, read_a_scan
+from envelope import envelope, OFFSET
+from cache import VELOCITY
+from depth import depth_axis, sample_range
+
+
+GATE_MARGIN = 64  # Samples read on both sides of the gate, so the envelope is not cut off
+
+
+def _read_rows(path, start, stop):
+    """Parses rows `start' up to `stop' of a `<x>.txt' file into a (rows, 2) array."""
+    with open(path) as file:
+        return np.fromstring(''.join(islice(file, start, stop)), sep=' ').reshape(-1, 2)
+
+
+def sample_gate(path, gate, velocity=VELOCITY):
+    """Converts an inclusive (min, max) depth range in mm to a (start, stop) sample range,
+    using the sample times (ms) in `path' and the sound-speed profile `velocity' (see depth.py).
+    """
+    return sample_range(depth_axis(read_a_scan(path)[:, 0], velocity), gate)
+
+
+def gated_profile(folder, gate, unit='sample', reduction=np.sum, use_envelope=True,
+                  offset=OFFSET, velocity=VELOCITY, margin=GATE_MARGIN):
+    """Returns (positions, values): `reduction' of each A-scan in `folder' over the depth gate.
+
+    `gate' is a (start, stop) sample range (as a slice) with unit='sample', or an inclusive
+    (min, max) depth range with unit='mm'. The reduction is applied to the envelope, or to the
+    A-scan minus `offset' if not `use_envelope'.
+    """
+    positions, paths = scan_files(folder)
+    if not paths:
+        raise FileNotFoundError(f"No .txt files found in '{folder}'!")
+    start, stop = sample_gate(paths[0], gate, velocity) if unit == 'mm' else gate
+    if stop <= start:
+        raise ValueError(f"The gate {gate} ({unit}) is empty!")
+    read_start = max(start - margin, 0) if use_envelope else start
+    read_stop = stop + margin if use_envelope else stop
+
+    values = np.empty(len(paths))
+    for i, path in enumerate(paths):
+        a_scan = _read_rows(path, read_start, read_stop)[:, 1]
+        if use_envelope:
+            gated = envelope(a_scan[None, :], offset)[0]
+        else:
+            gated = a_scan - offset
+        values[i] = reduction(gated[start - read_start:stop - read_start])
+    return positions, values
@@ -1,5 +1,4 @@
 import numpy as np
-import pandas as pd
 import os
 
 from matplotlib import pyplot as plt
@@ -8,6 +7,8 @@ from scipy import signal
 from lmfit import models, Parameter, Parameters
 import click
 
+from bscan import load_bscan
+
 
 # folder = 'meting3/'
 fig, ax = plt.subplots()
@@ -15,15 +16,11 @@ fig, ax = plt.subplots()
 
 def make_gauss(folder):
 
-    df = pd.read_csv(folder + "data.csv")
-    print(df)
-    # print(df['20.0'])
-    df.drop(["Unnamed: 0", "t"], axis=1, inplace=True)
-
-    # print(df)
+    scan = load_bscan(folder)
+    print(scan.frame())
 
-    xs = np.array([float(x) for x in df.columns])
-    ys = np.array([sum(df[x]) for x in df.columns])
+    xs = scan.positions
+    ys = scan.data.sum(axis=1, dtype=np.float64)
 
     def f(x, sigma, amp, mu, base):
         return base + amp * np.exp(-((x - mu) / sigma)**2 / 2)
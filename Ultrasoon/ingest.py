@@ -0,0 +1,92 @@
+"""Loads a measurement folder (`metingX/', one `<x>.txt' A-scan per scan position) into a single array.
+
+The A-scans are parsed once into a float32 (positions, samples) array `scan.npy', that is opened as
+a np.memmap afterwards. The scan positions and the sample times are stored next to it, in
+`positions.npy' and `times.npy', and the fingerprint of the ingested .txt files in `scan.sha1'.
+The folder is ingested again when its .txt files (names, sizes or mtimes) no longer match it.
+Usage:
+    positions, times, scan = load_folder("meting24/")
+    scan[i]  # The A-scan at positions[i]
+"""
+import hashlib
+import os
+
+import numpy as np
+
+
+SCAN_FILE = "scan.npy"
+POSITIONS_FILE = "positions.npy"
+TIMES_FILE = "times.npy"
+FINGERPRINT_FILE = "scan.sha1"
+
+
+def scan_files(folder):
+    """Returns the scan positions (sorted) and the paths of their .txt files in `folder'."""
+    files = {float(os.path.splitext(file)[0]): os.path.join(folder, file)
+             for file in os.listdir(folder) if os.path.splitext(file)[1] == '.txt'}
+    positions = sorted(files)
+    return np.array(positions), [files[x] for x in positions]
+
+
+def fingerprint(paths):
+    """Returns the sha1 hex digest of the names, sizes and modification times of the files `paths'."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f";{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def read_a_scan(path):
+    """Parses a `<x>.txt' file (time \\t value lines), returns the (samples, 2) array."""
+    with open(path) as file:
+        return np.fromstring(file.read(), sep=' ').reshape(-1, 2)
+
+
+def ingest_folder(folder):
+    """Parses all A-scans in `folder', one file at a time, straight into the memory-mapped scan.npy."""
+    positions, paths = scan_files(folder)
+    if not paths:
+        raise FileNotFoundError(f"No .txt files found in '{folder}'!")
+
+    first = read_a_scan(paths[0])
+    scan = np.lib.format.open_memmap(os.path.join(folder, SCAN_FILE), mode='w+', dtype=np.float32,
+                                     shape=(len(paths), len(first)))
+    scan[0] = first[:, 1]
+    for i, path in enumerate(paths[1:], start=1):
+        a_scan = read_a_scan(path)
+        if len(a_scan) != len(first):
+            raise ValueError(f"'{path}' has {len(a_scan)} samples, expected {len(first)}!")
+        scan[i] = a_scan[:, 1]
+    scan.flush()
+    del scan
+
+    np.save(os.path.join(folder, POSITIONS_FILE), positions)
+    np.save(os.path.join(folder, TIMES_FILE), first[:, 0])
+    # Written last, an interrupted ingest is not mistaken for a complete one
+    with open(os.path.join(folder, FINGERPRINT_FILE), 'w') as file:
+        file.write(fingerprint(paths))
+
+
+def is_ingested(folder):
+    """Whether scan.npy exists and was ingested from the current .txt files in `folder'."""
+    files = (SCAN_FILE, POSITIONS_FILE, TIMES_FILE, FINGERPRINT_FILE)
+    if not all(os.path.exists(os.path.join(folder, file)) for file in files):
+        return False
+    _, paths = scan_files(folder)
+    if not paths:  # Only the ingested files are left
+        return True
+    with open(os.path.join(folder, FINGERPRINT_FILE)) as file:
+        return file.read() == fingerprint(paths)
+
+
+def load_folder(folder):
+    """Returns (positions, times, scan) of `folder'. `scan' is a read-only float32 memmap
+    of shape (positions, samples). The folder is (re)ingested if needed.
+    """
+    if not is_ingested(folder):
+        ingest_folder(folder)
+    positions = np.load(os.path.join(folder, POSITIONS_FILE))
+    times = np.load(os.path.join(folder, TIMES_FILE))
+    scan = np.load(os.path.join(folder, SCAN_FILE), mmap_mode='r')
+    return positions, times, scan
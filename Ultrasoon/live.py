@@ -0,0 +1,88 @@
+"""A B-scan image that is filled in column by column while a measurement folder is being written.
+
+The image buffer is allocated once, for the scan positions start, start + step, ..., end. Every poll,
+the `<x>.txt' files that appeared (and are no longer growing) are processed into their column.
+Files that cannot be processed (outside of the scan range, or still being written) are logged and
+tried again at the next polls.
+Usage:
+    image = LiveImage("meting25/", start=40, end=120, step=0.2)
+    while not image.complete:
+        image.poll()  # Returns the indices of the columns that were updated
+"""
+import os
+import logging
+
+import numpy as np
+
+from ingest import read_a_scan
+from envelope import envelope, OFFSET
+from cache import VELOCITY
+from depth import depth_axis
+
+
+class LiveImage:
+    """Envelope image `buffer' (positions, samples) of the folder `folder', NaN where not measured yet."""
+
+    def __init__(self, folder, start, end, step, offset=OFFSET, velocity=VELOCITY):
+        self.folder = folder
+        self.positions = start + step * np.arange(round((end - start) / step) + 1)
+        self.start, self.step = start, step
+        self.offset, self.velocity = offset, velocity
+        self.buffer = None  # Allocated when the number of samples is known, at the first A-scan
+        self.depths = None
+        self.done = set()
+        self.errors = {}  # The last error of the files that could not be processed, by name
+        self._sizes = {}
+
+    @property
+    def complete(self):
+        return len(self.done) == len(self.positions)
+
+    def _new_files(self):
+        """Returns the .txt files that were not processed yet and did not grow since the last poll."""
+        ready = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                name, extension = os.path.splitext(entry.name)
+                if extension != '.txt' or entry.name in self.done:
+                    continue
+                try:
+                    x = float(name)
+                except ValueError:
+                    continue
+                size = entry.stat().st_size
+                if size and self._sizes.get(entry.name) == size:
+                    ready.append((x, entry.path))
+                self._sizes[entry.name] = size
+        return ready
+
+    def add(self, x, a_scan):
+        """Puts the envelope of `a_scan' (samples, 2) at position `x' into the buffer, returns its index."""
+        if self.buffer is None:
+            self.buffer = np.full((len(self.positions), len(a_scan)), np.nan, dtype=np.float32)
+            self.depths = depth_axis(a_scan[:, 0], self.velocity)
+        if len(a_scan) != self.buffer.shape[1]:
+            raise ValueError(f"The A-scan at {x} has {len(a_scan)} samples, expected {self.buffer.shape[1]}!")
+        index = int(round((x - self.start) / self.step))
+        if not 0 <= index < len(self.positions):
+            raise ValueError(f"The position {x} is outside of the scan range!")
+        envelope(a_scan[None, :, 1], offset=self.offset, out=self.buffer[index:index + 1])
+        return index
+
+    def poll(self):
+        """Processes the new A-scans in the folder, returns the indices of the updated columns.
+        A file that fails is skipped and tried again at the next poll, its error is logged once.
+        """
+        updated = []
+        for x, path in sorted(self._new_files()):
+            name = os.path.basename(path)
+            try:
+                updated.append(self.add(x, read_a_scan(path)))
+            except ValueError as error:
+                if self.errors.get(name) != str(error):
+                    logging.warning(f"Skipped '{path}': {error}")
+                self.errors[name] = str(error)
+                continue
+            self.done.add(name)
+            self.errors.pop(name, None)
+        return updated
@@ -1,12 +1,11 @@
 import numpy as np
-import pandas as pd
-import os
 
 from matplotlib import pyplot as plt
 import matplotlib.ticker as ticker
-from scipy import signal
 import click
 
+from bscan import load_bscan
+
 plt.rcParams.update({
     "text.usetex": True,
     "font.family": "serif",
@@ -36,31 +35,23 @@ def make_image(folder):
 
 
     # else:
-    # Getting basic data about the image
-    xs = sorted([float(os.path.splitext(file)[0])
-                 for file in os.listdir(folder) if os.path.splitext(file)[1] == '.txt'])
+    # Getting basic data and the envelopes of all A-scans, see bscan.py
+    scan = load_bscan(folder)
+    xs = scan.positions
     x_start, x_end = min(xs), max(xs)
     stepsize = xs[1] - xs[0]
 
     #plt.rcParams["font.family"] = "Helvetica"
 
-    df = pd.DataFrame()
-
-    # Loading data
-    for x in np.arange(x_start, x_end + stepsize, stepsize):
-
-        df_temp = pd.read_csv(f"{folder}{x:.6f}.txt", sep='\t', header=None)
-
-        # Initial processing
-        df[f'{x}'] = np.abs(signal.hilbert(df_temp[1] - 127))
+    df = scan.frame()
 
     print(df.columns)
     # Timed points to distance conversion
-    total_y_points = len(df[f"{xs[0]:.1f}"])
+    total_y_points = len(scan.times)
 
-    total_time = (df_temp.iloc[-1, 0] - df_temp.iloc[0, 0]) / 1000  # s
-    velocity = 1500  # m/s
-    total_distance_y = total_time * velocity * 1000  # mm
+    # The pictures keep the time of flight * speed axis of the originals, twice the depth (see depth.py)
+    picture_y = 2 * scan.depths
+    total_distance_y = picture_y[-1]  # mm
 
     # Creating our picture
     fig, (ax1, ax2) = plt.subplots(ncols=2)
@@ -75,7 +66,7 @@ def make_image(folder):
     ax1.invert_yaxis()
 
     ticks_y = ticker.FuncFormatter(
-        lambda y, pos: f"{(y / total_y_points *  total_distance_y):.0f}")
+        lambda y, pos: f"{np.interp(y, np.arange(total_y_points), picture_y):.0f}")
     ax1.yaxis.set_major_formatter(ticks_y)
 
     ticks_x = ticker.FuncFormatter(
@@ -87,7 +78,7 @@ def make_image(folder):
     ax1.set_ylabel(r"Depth $y\ (mm)$")
 
 
-    ys = [sum(df[x]) for x in df.columns]
+    ys = scan.data.sum(axis=1, dtype=np.float64)
     ax2.plot(xs, ys, c='#2190eb')
     ax2.set_xlim(x_end, x_start)
     ax2.set_aspect(0.012)
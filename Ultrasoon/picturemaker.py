@@ -1,22 +1,22 @@
 import numpy as np
-import pandas as pd
-import os
 
 from matplotlib import pyplot as plt
 import matplotlib.ticker as ticker
-from scipy import signal
 import click
 
+from bscan import load_bscan
+
 
 # folder = 'meting3/'
 
 
 # @click.command()
 # @click.argument('folder', type=str)
-def make_image(folder):
-    """Make an image using all the data in `folder'.
+def make_image(folder, show=True):
+    """Make an image using all the data in `folder', saved as `folder'picture.png.
 
         FOLDER should be in the form of `metingX/', with X an integer.
+        If not `show', the figure is closed instead of shown (for use with the Agg backend).
     """
     # if '.csv' in [os.path.splitext(file)[1] for file in os.listdir(folder)]:
     #     df = pd.read_csv(f'{folder}data.csv')
@@ -29,31 +29,23 @@ def make_image(folder):
 
 
     # else:
-    # Getting basic data about the image
-    xs = sorted([float(os.path.splitext(file)[0])
-                 for file in os.listdir(folder) if os.path.splitext(file)[1] == '.txt'])
+    # Getting basic data and the envelopes of all A-scans, see bscan.py
+    scan = load_bscan(folder)
+    xs = scan.positions
     x_start, x_end = min(xs), max(xs)
     stepsize = xs[1] - xs[0]
 
     #plt.rcParams["font.family"] = "Helvetica"
 
-    df = pd.DataFrame()
-
-    # Loading data
-    for x in np.arange(x_start, x_end + stepsize, stepsize):
-
-        df_temp = pd.read_csv(f"{folder}{x:.6f}.txt", sep='\t', header=None)
-
-        # Initial processing
-        df[f'{x}'] = np.abs(signal.hilbert(df_temp[1] - 127))
+    df = scan.frame()
 
     print(df.columns)
     # Timed points to distance conversion
-    total_y_points = len(df[f"{xs[0]:.1f}"])
+    total_y_points = len(scan.times)
 
-    total_time = (df_temp.iloc[-1, 0] - df_temp.iloc[0, 0]) / 1000  # s
-    velocity = 1500  # m/s
-    total_distance_y = total_time * velocity * 1000  # mm
+    # The pictures keep the time of flight * speed axis of the originals, twice the depth (see depth.py)
+    picture_y = 2 * scan.depths
+    total_distance_y = picture_y[-1]  # mm
 
     # Creating our picture
     fig, ax = plt.subplots()
@@ -67,7 +59,7 @@ def make_image(folder):
     ax.invert_yaxis()
 
     ticks_y = ticker.FuncFormatter(
-        lambda y, pos: f"{(y / total_y_points *  total_distance_y):.0f}")
+        lambda y, pos: f"{np.interp(y, np.arange(total_y_points), picture_y):.0f}")
     ax.yaxis.set_major_formatter(ticks_y)
 
     ticks_x = ticker.FuncFormatter(
@@ -80,11 +72,10 @@ def make_image(folder):
 
     plt.savefig(f"{folder}picture.png")
 
-    # Save dataframe
-    df['t'] = df_temp[0]
-    df.to_csv(f'{folder}data.csv')
-
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,153 @@
+"""Synthetic aperture focusing (SAFT) of a B-scan, by delay-and-sum of the raw A-scans.
+
+For every pixel (x, z), the A-scans measured within the aperture around x are summed at the sample
+where a reflector at (x, z) would be seen from their position x', at range sqrt((x - x')^2 + z^2),
+with z the depth (the one-way distance, see depth.py) measured from the transducer.
+The envelope of the sum is the focused image, with a lateral resolution that is not limited by
+the beam spread. The scan positions are equidistant, so the delays only depend on x - x' and z:
+they are computed once, as a delay table of (aperture offsets, samples) with interpolation weights.
+Summing the raw A-scans (coherent) needs A-scans that are phase-locked between positions. The
+A-scans of meting24 jitter by up to a period between positions, which cancels the coherent sum,
+so they are first aligned by cross-correlation with their mean (see align()).
+Usage:
+    scan = saft_folder("meting24/", aperture=10)  # A BScan, see bscan.py
+    python saft.py  # Benchmark on meting24, and the hwhm of the dip per aperture
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import fft
+
+from ingest import load_folder
+from envelope import envelope, OFFSET
+from depth import depth_axis
+from cache import VELOCITY
+from bscan import BScan
+
+
+APERTURE = 10  # mm, the full width of the synthetic aperture
+MAX_LAG = 16  # samples, the largest shift of align(), about a period of the 3.75 MHz pulse
+
+
+def align(scan, offset=OFFSET, max_lag=MAX_LAG, iterations=3):
+    """Returns (aligned, lags): the A-scans (rows) of `scan' minus `offset', shifted by a fraction of a
+    sample to line up with their mean, in float32, and the shifts (samples). The shift of each A-scan is
+    the maximum of its cross-correlation with the reference within +-`max_lag', refined by a parabola
+    through its neighbours. The reference starts as the strongest A-scan, then is the mean of the aligned ones.
+    """
+    rows = np.asarray(scan, dtype=np.float64) - offset
+    n = rows.shape[1]
+    spectra = fft.rfft(rows, n=2 * n, axis=1)  # Zero padded, the shifts do not wrap around
+    frequencies = fft.rfftfreq(2 * n)
+    candidates = np.concatenate([np.arange(max_lag + 1), np.arange(-max_lag, 0)])
+    index = np.arange(len(rows))
+    reference = rows[np.argmax(np.abs(rows).sum(axis=1))]
+    for _ in range(iterations):
+        correlation = fft.irfft(spectra * np.conj(fft.rfft(reference, n=2 * n)), axis=1)
+        best = candidates[np.argmax(correlation[:, candidates], axis=1)]
+        before, peak, after = (correlation[index, (best + k) % (2 * n)] for k in (-1, 0, 1))
+        curvature = before - 2 * peak + after
+        lags = best + np.where(curvature < 0, 0.5 * (before - after) / np.where(curvature < 0, curvature, -1), 0)
+        aligned = fft.irfft(spectra * np.exp(2j * np.pi * frequencies * lags[:, None]), axis=1)[:, :n]
+        reference = aligned.mean(axis=0)
+    return aligned.astype(np.float32), lags
+
+
+def delay_table(depths, step, aperture=APERTURE, z0=0.):
+    """Returns (index, weight) tables of shape (aperture offsets, samples): the pixel at depths[k]
+    takes (1 - weight) * sample index and weight * sample index + 1 of the A-scan `offset' positions
+    away. Index len(depths) means out of range. `step' is the distance between positions (mm),
+    `z0' the depth (mm) of the first sample, measured from the transducer.
+    """
+    n = len(depths)
+    half = int(aperture / 2 / step)
+    dx = step * np.arange(-half, half + 1)
+    # The depth at which the reflector at lateral offset dx appears in the A-scan
+    ranges = np.sqrt(dx[:, None]**2 + (z0 + depths[None, :])**2) - z0
+    samples = np.interp(ranges, depths, np.arange(n), right=n)
+    index = np.floor(samples).astype(np.intp)
+    return index, (samples - index).astype(np.float32)
+
+
+def saft(scan, depths, step, aperture=APERTURE, offset=OFFSET, z0=0., coherent=True, max_lag=MAX_LAG,
+         apodization=np.hanning, workers=None, chunk_size=32):
+    """Returns the SAFT image (positions, samples) in float32 of `scan', the raw (positions, samples) A-scans.
+    If `coherent', the A-scans are aligned first (see align(), max_lag=0 to skip that), otherwise the
+    envelopes are summed instead of the A-scans. The contributions within the
+    aperture are weighted with the `apodization' window, and normalised by the weight that is in range.
+    Chunks of `chunk_size' positions are reconstructed in a thread pool with `workers' threads.
+    """
+    index, weight = delay_table(depths, step, aperture, z0)
+    n_offsets, n = index.shape
+    half = n_offsets // 2
+    window = apodization(n_offsets + 2)[1:-1].astype(np.float32)
+
+    # Zero padding: `half' positions on both sides and 2 samples, for the out of range delays
+    padded = np.zeros((len(scan) + 2 * half, n + 2), dtype=np.float32)
+    if not coherent:
+        padded[half:len(scan) + half, :n] = envelope(scan, offset=offset)
+    elif max_lag:
+        padded[half:len(scan) + half, :n] = align(scan, offset, max_lag)[0]
+    else:
+        padded[half:len(scan) + half, :n] = np.asarray(scan) - np.float32(offset)
+    # The total weight of the contributions that are in range, per (position, sample)
+    in_range = np.zeros((len(scan), n_offsets), dtype=np.float32)
+    for j in range(n_offsets):
+        in_range[max(half - j, 0):len(scan) + half - j, j] = 1
+    norm = in_range @ (window[:, None] * (index < n))
+    out = np.empty((len(scan), n), dtype=np.float32)
+
+    def process(start):
+        stop = min(start + chunk_size, len(scan))
+        total = np.zeros((stop - start, n), dtype=np.float32)
+        for j in range(n_offsets):
+            rows = padded[start + j:stop + j]
+            total += window[j] * (rows[:, index[j]] * (1 - weight[j]) + rows[:, index[j] + 1] * weight[j])
+        total /= np.maximum(norm[start:stop], np.finfo(np.float32).tiny)
+        if coherent:
+            envelope(total, offset=0, out=out[start:stop])
+        else:
+            out[start:stop] = total
+
+    starts = range(0, len(scan), chunk_size)
+    if workers is None or workers <= 1:
+        for start in starts:
+            process(start)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(process, starts))
+    return out
+
+
+def saft_folder(folder, aperture=APERTURE, velocity=VELOCITY, **kwargs):
+    """Returns the SAFT image of `folder' as a BScan, keyword arguments are passed on to saft.
+    Unless given, `z0' is the depth of the first sample, at time times[0] after the pulse.
+    """
+    positions, times, scan = load_folder(folder)
+    depths = depth_axis(times, velocity)
+    kwargs.setdefault('z0', depth_axis(np.append(0, times), velocity)[1])
+    image = saft(scan, depths, positions[1] - positions[0], aperture, **kwargs)
+    return BScan(positions, times, depths, image)
+
+
+if __name__ == '__main__':
+    # Benchmark on meting24
+    import os
+    from bscan import load_bscan
+    from widths import stack_profiles, analyse_profiles
+
+    folder = "meting24/"
+    load_folder(folder)  # Ingest first, not part of the benchmark
+    for workers in (1, os.cpu_count()):
+        start = time.perf_counter()
+        saft_folder(folder, workers=workers)
+        print(f"SAFT of {folder} with {workers} workers: {time.perf_counter() - start:.2f} s")
+
+    scans = [("envelope", load_bscan(folder))]
+    scans += [(f"SAFT {aperture} mm", saft_folder(folder, aperture)) for aperture in (1, 2, 5, 10)]
+    scans += [("SAFT 10 mm, incoherent", saft_folder(folder, coherent=False))]
+    for name, scan in scans:
+        result = analyse_profiles(*stack_profiles([scan]), base_window=(-np.inf, 75), method='cubic')
+        print(f"{name}: hwhm = {result['hwhm'][0]:.3f} ± {result['hwhm_error'][0]:.3f} mm, "
+              f"c_v = {result['c_v'][0]:.1f}")
@@ -0,0 +1,78 @@
+"""Command line interface for the Ultrasoon analysis.
+Usage:
+    python ultrasoon.py render "meting*/" --workers 4
+"""
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # Before picturemaker imports pyplot, also in the worker processes
+import click
+
+from cache import raw_files
+from picturemaker import make_image
+
+
+PICTURE_FILE = "picture.png"
+SOURCE_FILES = [os.path.join(os.path.dirname(os.path.abspath(__file__)), file)
+                for file in ("picturemaker.py", "ingest.py", "envelope.py", "depth.py", "cache.py", "bscan.py")]
+
+
+def is_up_to_date(folder):
+    """Whether the picture of `folder' is newer than its raw files and the code that renders it."""
+    picture = os.path.join(folder, PICTURE_FILE)
+    if not os.path.exists(picture):
+        return False
+    newest = max(os.path.getmtime(path) for path in raw_files(folder) + SOURCE_FILES)
+    return os.path.getmtime(picture) >= newest
+
+
+def render_folder(folder, force=False):
+    """Renders the picture of `folder' if it is not up to date. Returns (folder, status, seconds)."""
+    start = time.perf_counter()
+    try:
+        if not force and is_up_to_date(folder):
+            return folder, "up to date", time.perf_counter() - start
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_image(folder, show=False)
+    except Exception as error:
+        return folder, f"failed: {error!r}", time.perf_counter() - start
+    return folder, "rendered", time.perf_counter() - start
+
+
+@click.group()
+def ultrasoon():
+    pass
+
+
+@ultrasoon.command()
+@click.argument('pattern', type=str, default="meting*/")
+@click.option("--workers", default=os.cpu_count(), type=int, help="The number of worker processes.")
+@click.option("--force", is_flag=True, help="Also render the pictures that are up to date.")
+def render(pattern, workers, force):
+    """Renders `picture.png' of all folders matching PATTERN (e.g. "meting*/") in parallel.
+    Folders of which the picture is newer than the raw data are skipped, unless --force is given.
+    """
+    folders = sorted(folder if folder.endswith(os.sep) else folder + os.sep
+                     for folder in glob.glob(pattern) if os.path.isdir(folder))
+    if not folders:
+        raise click.ClickException(f"No folders match '{pattern}'!")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(render_folder, folders, [force] * len(folders)))
+
+    width = max(len(folder) for folder in folders)
+    for folder, status, seconds in results:
+        click.echo(f"{folder:<{width}}  {seconds:7.2f} s  {status}")
+    rendered = sum(status == "rendered" for _, status, _ in results)
+    click.echo(f"{rendered} of {len(folders)} pictures rendered in {time.perf_counter() - start:.2f} s "
+               f"({workers} workers).")
+
+
+if __name__ == '__main__':
+    ultrasoon()
@@ -0,0 +1,112 @@
+"""Shows the B-scan image of a measurement folder live, while the A-scans are being written.
+
+A WatchThread polls the folder (see live.py) and a QTimer redraws the pyqtgraph ImageItem, at most
+`fps' times per second and only when a column was added. The pyqtgraph setup follows
+pythonlab/views/interface.py.
+Usage:
+    python watch.py meting25/ --start 40 --end 120 --step 0.2
+"""
+import sys
+import time
+import logging
+
+import numpy as np
+from PyQt5 import QtWidgets, QtCore
+import pyqtgraph as pg
+import click
+
+from live import LiveImage
+
+pg.setConfigOption("background", "w")
+pg.setConfigOption("foreground", "k")
+
+
+class WatchThread(QtCore.QThread):
+    """Polls `image' (a LiveImage) every `interval' seconds, emits the indices of the updated columns."""
+    columns_signal = QtCore.pyqtSignal(list)
+
+    def __init__(self, image, interval=0.2):
+        QtCore.QThread.__init__(self)
+        self.image = image
+        self.interval = interval
+        self.running = True
+
+    def __del__(self):
+        self.running = False
+        self.wait()
+
+    def run(self):
+        while self.running and not self.image.complete:
+            # Files that fail are logged and retried by the LiveImage, the thread keeps polling
+            updated = self.image.poll()
+            if updated:
+                self.columns_signal.emit(updated)
+                logging.debug(f"Columns {updated} added.")
+            time.sleep(self.interval)
+
+
+class LiveWindow(QtWidgets.QMainWindow):
+    """Window with the live image of a LiveImage, redrawn at most `fps' times per second."""
+
+    def __init__(self, image, fps=10):
+        super().__init__()
+        self.image = image
+        self.setWindowTitle(f"Live image {image.folder}")
+
+        self.plotwidget = pg.PlotWidget()
+        self.setCentralWidget(self.plotwidget)
+        self.plotwidget.setLabel("left", "Depth y (mm)")
+        self.plotwidget.setLabel("bottom", "Horizontal distance x (mm)")
+        self.plotwidget.invertY(True)
+        self.image_item = pg.ImageItem()
+        self.plotwidget.addItem(self.image_item)
+
+        # Redraw timer, only redraws if new columns were added since the last frame
+        self.dirty = False
+        self.plot_timer = QtCore.QTimer()
+        self.plot_timer.timeout.connect(self._plot)
+        self.plot_timer.start(int(1000 / fps))
+
+        self.data_thread = WatchThread(image)
+        self.data_thread.columns_signal.connect(self.mark_dirty)
+        self.data_thread.start()
+
+    def mark_dirty(self, columns):
+        self.dirty = True
+
+    def _plot(self):
+        """Shows the current buffer on the ImageItem, not measured columns are 0."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        image = np.nan_to_num(self.image.buffer)
+        self.image_item.setImage(image, autoLevels=False, levels=(0, max(image.max(), 1)))
+        step, depth = self.image.step, self.image.depths[-1]
+        self.image_item.setRect(QtCore.QRectF(self.image.positions[0] - step / 2, 0,
+                                              len(self.image.positions) * step, depth))
+
+    def closeEvent(self, event):
+        self.plot_timer.stop()
+        self.data_thread.running = False
+        self.data_thread.wait()
+        super().closeEvent(event)
+
+
+@click.command()
+@click.argument('folder', type=str)
+@click.option("--start", type=float, required=True, help="The first scan position (mm).")
+@click.option("--end", type=float, required=True, help="The last scan position (mm).")
+@click.option("--step", type=float, required=True, help="The step between scan positions (mm).")
+@click.option("--fps", default=10, type=float, help="The maximum number of redraws per second.")
+@click.option("--log", default='warning', type=str, help="The logging level.")
+def watch(folder, start, end, step, fps, log):
+    """Shows the image of FOLDER (`metingX/') live, while its A-scans are being measured."""
+    logging.basicConfig(level=getattr(logging, log.upper()))
+    app = QtWidgets.QApplication(sys.argv)
+    window = LiveWindow(LiveImage(folder, start, end, step), fps=fps)
+    window.show()
+    sys.exit(app.exec())
+
+
+if __name__ == '__main__':
+    watch()
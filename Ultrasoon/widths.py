@@ -0,0 +1,152 @@
+"""Peak width (HWHM) and contrast of the total amplitude profiles of many B-scans at once.
+
+The profile of a B-scan is the total amplitude (sum of the envelope) per scan position, the
+reflection shows as a dip in it. All profiles are stacked into one (folders, positions) array,
+padded with NaN, so that every quantity is a single NumPy reduction over all folders:
+    base_mean, base_std: mean and std of the profile within the baseline x window
+    minimum, mu: the bottom of the dip and its position
+    c_v: the contrast (Victor) coefficient, (base_mean - minimum) / base_std
+    x_left, x_right: the half height crossings, interpolated linearly or with a cubic
+    width, width_error: the full width at half maximum (x_right - x_left) and its uncertainty
+    hwhm, hwhm_error: half of those
+The per-folder metadata (block distance, x_end of the fit region) is read from metadata.csv.
+Usage:
+    table = analyse_folders([f"meting{n}/" for n in range(13, 25)])
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from bscan import load_bscan
+
+
+METADATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metadata.csv")
+BASE_WINDOW = (-np.inf, 62)  # mm, where only the baseline reflection is seen
+
+
+def load_metadata(path=METADATA_FILE):
+    """Returns the per-folder metadata as a DataFrame indexed by folder (`metingX/')."""
+    return pd.read_csv(path, index_col='folder')
+
+
+def stack_profiles(scans, t=None, depth=None):
+    """Stacks the profiles of `scans' (BScans) into (positions, profiles), both of shape
+    (len(scans), most positions), padded with NaN. `t' (ms) or `depth' (mm) is an optional (min, max) range.
+    """
+    scans = [scan.select(t=t, depth=depth) for scan in scans]
+    positions = np.full((len(scans), max(len(scan.positions) for scan in scans)), np.nan)
+    profiles = np.full_like(positions, np.nan)
+    for i, scan in enumerate(scans):
+        positions[i, :len(scan.positions)] = scan.positions
+        profiles[i, :len(scan.positions)] = scan.data.sum(axis=1, dtype=np.float64)
+    return positions, profiles
+
+
+def _take(a, index):
+    """The element at `index' (one per row) of each row of `a'."""
+    return np.take_along_axis(a, index[:, None], axis=1)[:, 0]
+
+
+def _linear_crossing(positions, profiles, i0, y):
+    """The x and slope where the line through samples `i0' and `i0' + 1 of each profile reaches `y'."""
+    x0, x1 = _take(positions, i0), _take(positions, i0 + 1)
+    y0, y1 = _take(profiles, i0), _take(profiles, i0 + 1)
+    slope = (y1 - y0) / (x1 - x0)
+    return x0 + (y - y0) / slope, slope
+
+
+def _cubic_crossing(positions, profiles, i0, y, iterations=40):
+    """The x and slope where the cubic through the 4 samples around `i0' and `i0' + 1 of each profile
+    reaches `y', between those two samples. Found by bisection, vectorized over the profiles.
+    """
+    n_valid = np.sum(np.isfinite(profiles), axis=1)
+    index = np.clip(i0 - 1, 0, np.maximum(n_valid - 4, 0))[:, None] + np.arange(4)
+    index = np.minimum(index, profiles.shape[1] - 1)
+
+    # Local coordinate u: 0 at sample i0, 1 at sample i0 + 1
+    x0 = _take(positions, i0)
+    dx = _take(positions, i0 + 1) - x0
+    u = (np.take_along_axis(positions, index, axis=1) - x0[:, None]) / dx[:, None]
+    v = np.take_along_axis(profiles, index, axis=1) - y[:, None]
+    valid = (n_valid >= 4) & np.isfinite(u).all(axis=1) & np.isfinite(v).all(axis=1)
+    u[~valid], v[~valid] = np.arange(4) - 1, 0
+    c = np.linalg.solve(u[..., None] ** np.arange(4), v[..., None])[..., 0]
+
+    def poly(u):
+        return c[:, 0] + u * (c[:, 1] + u * (c[:, 2] + u * c[:, 3]))
+
+    low, high = np.zeros(len(c)), np.ones(len(c))
+    p_low = poly(low)
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        p_middle = poly(middle)
+        same = np.sign(p_middle) == np.sign(p_low)
+        low, p_low = np.where(same, middle, low), np.where(same, p_middle, p_low)
+        high = np.where(same, high, middle)
+    root = (low + high) / 2
+    slope = (c[:, 1] + root * (2 * c[:, 2] + root * 3 * c[:, 3])) / dx
+    return np.where(valid, x0 + root * dx, np.nan), np.where(valid, slope, np.nan)
+
+
+def half_max_crossings(positions, profiles, half_height, i_min, method='linear'):
+    """Returns the positions (x_left, x_right) where each profile rises above `half_height' on
+    either side of its minimum at index `i_min', and the slopes of the profiles there.
+    Interpolated with `method', 'linear' or 'cubic'. NaN if there is no crossing.
+    """
+    crossing = {'linear': _linear_crossing, 'cubic': _cubic_crossing}[method]
+    n = profiles.shape[1]
+    index = np.arange(n)
+    above = profiles >= half_height[:, None]  # NaN padding is never above
+    left = np.where(above & (index < i_min[:, None]), index, -1).max(axis=1)
+    right = np.where(above & (index > i_min[:, None]), index, n).min(axis=1)
+
+    x_left, slope_left = crossing(positions, profiles, np.clip(left, 0, n - 2), half_height)
+    x_right, slope_right = crossing(positions, profiles, np.clip(right - 1, 0, n - 2), half_height)
+    has_left, has_right = left >= 0, right < n
+    return (np.where(has_left, x_left, np.nan), np.where(has_right, x_right, np.nan),
+            np.where(has_left, slope_left, np.nan), np.where(has_right, slope_right, np.nan))
+
+
+def analyse_profiles(positions, profiles, base_window=BASE_WINDOW, method='linear'):
+    """Returns a dict of the dip quantities (see the module docstring) of the stacked `profiles',
+    each an array with a value per profile. The baseline is taken over base_window[0] <= x < base_window[1],
+    the half height crossings are interpolated with `method', 'linear' or 'cubic'.
+    """
+    low, high = base_window
+    base = np.where((positions >= low) & (positions < high), profiles, np.nan)
+    base_mean = np.nanmean(base, axis=1)
+    base_std = np.nanstd(base, axis=1)
+
+    i_min = np.nanargmin(profiles, axis=1)
+    minimum = _take(profiles, i_min)
+    mu = _take(positions, i_min)
+
+    half_height = (base_mean + minimum) / 2
+    x_left, x_right, slope_left, slope_right = half_max_crossings(positions, profiles, half_height, i_min, method)
+
+    # The noise on the profile (base_std) shifts each crossing by base_std / |slope|. The error on the
+    # half height (from base_mean and the minimum) shifts both crossings in opposite directions.
+    half_height_error = base_std * np.sqrt(1 / np.sum(np.isfinite(base), axis=1) + 1) / 2
+    width = x_right - x_left
+    width_error = np.sqrt(base_std**2 * (1 / slope_left**2 + 1 / slope_right**2)
+                          + (half_height_error * (1 / np.abs(slope_left) + 1 / np.abs(slope_right)))**2)
+    return {
+        'base_mean': base_mean, 'base_std': base_std, 'minimum': minimum, 'mu': mu,
+        'c_v': (base_mean - minimum) / base_std, 'half_height': half_height,
+        'x_left': x_left, 'x_right': x_right, 'width': width, 'width_error': width_error,
+        'hwhm': width / 2, 'hwhm_error': width_error / 2,
+    }
+
+
+def analyse_folders(folders, base_window=BASE_WINDOW, t=None, depth=None, method='linear', metadata=None):
+    """Analyses the B-scans of all `folders' in one batch. Returns a DataFrame indexed by folder,
+    with the metadata columns (see load_metadata) and the columns of analyse_profiles.
+    The profiles are summed over the optional time `t' (ms) or `depth' (mm) range.
+    """
+    if metadata is None:
+        metadata = load_metadata()
+    positions, profiles = stack_profiles([load_bscan(folder) for folder in folders], t=t, depth=depth)
+    table = pd.DataFrame(analyse_profiles(positions, profiles, base_window, method),
+                         index=pd.Index(folders, name='folder'))
+    return metadata.reindex(table.index).join(table)